@@ -0,0 +1,138 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ratelimit import Scheduler, INTERACTIVE, keys_of
+from metrics import metrics
+from stream import parse_response
+
+# ALPHAVANTAGE_URL points the application to another server, e.g. the local mock_server.py
+BASE_URL = os.environ.get("ALPHAVANTAGE_URL", "https://www.alphavantage.co/query")
+TIMEOUT = 30    # Seconds until a request is given up
+RETRIES = 2     # Retries of a call which AlphaVantage throttled with a "Note" (plus one per further key of a pool)
+
+logger = logging.getLogger(__name__)
+
+# One pooled session for the whole application, so the TCP/TLS connection is kept alive between the calls
+# (created on first use, importing requests takes about as long as everything else of the data layer)
+session = None
+session_lock = threading.Lock()
+
+# Threads for issuing independent calls at the same time (e.g. quote and symbol search in get_infos)
+executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="alphavantage")
+
+# Every call goes through the scheduler, which keeps each key within its per-minute and per-day budget
+scheduler = Scheduler()
+
+metrics.describe("alphavantage_requests_total", "AlphaVantage calls by endpoint and outcome")
+metrics.describe("alphavantage_request_seconds",
+                 "Time from sending a call until its answer is downloaded (until the headers for streamed series)")
+metrics.describe("alphavantage_decode_seconds",
+                 "Time for decoding the json of an answer (downloading and parsing for streamed series)")
+metrics.describe("alphavantage_queue_seconds", "Time a call waited for the rate limit of its key")
+metrics.describe("alphavantage_response_bytes_total", "Bytes downloaded by endpoint")
+metrics.describe("alphavantage_notes_total", "Calls throttled by AlphaVantage (Note) by key")
+metrics.describe("alphavantage_key_utilization", "Calls within the last minute / per-minute budget of the key")
+
+
+def scheduler_metrics():
+    """Function returns the counters, the budget and the utilization of the scheduler per key (collected on export)"""
+    samples = []
+    for label, counters in scheduler.stats().items():
+        for counter, value in counters.items():
+            samples.append((f"alphavantage_calls_{counter}_total", {"key": label}, value))
+    for label, budget in scheduler.budget().items():
+        samples.append(("alphavantage_calls_used_today", {"key": label}, budget["used today"]))
+        samples.append(("alphavantage_calls_per_day", {"key": label}, budget["per day"]))
+        samples.append(("alphavantage_calls_last_minute", {"key": label}, budget["last minute"]))
+        samples.append(("alphavantage_key_utilization", {"key": label},
+                        round(budget["last minute"] / budget["per minute"], 4)))
+    return samples
+
+
+metrics.register(scheduler_metrics)
+
+
+def get_session():
+    global session
+    with session_lock:
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+            session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        return session
+
+
+def warm_up():
+    """Function opens the connection to AlphaVantage ahead of the first call (no API call is spent)"""
+    import requests
+    try:
+        get_session().head(BASE_URL, timeout=TIMEOUT)
+    except requests.RequestException:   # Offline -> the first call reports the error
+        pass
+
+
+def decode_json(r):
+    return r.json(), len(r.content)
+
+
+def query(function, apikey, priority=INTERACTIVE, **params):
+    """Function calls an AlphaVantage endpoint and returns the decoded json (decoded only once),
+    the call waits for the rate limit of the key and is retried if AlphaVantage throttled it anyway.
+    apikey may be a KeyPool: the call goes to the key with the most budget left, after a "Note" to another one"""
+    return call(function, apikey, priority, params, decode_json)
+
+
+def query_series(function, apikey, series_key, priority=INTERACTIVE, stop_before=None, **params):
+    """Function calls a time series endpoint like query, but the answer is parsed while it is downloaded:
+    data[series_key] is a PriceSeries, the full history never has to be in memory as text or json.
+    With stop_before (YYYY-MM-DD) the download ends at the first older date (the newest date comes first)"""
+    decode = lambda r: parse_response(r, series_key, stop_before)
+    return call(function, apikey, priority, params, decode, stream=True)
+
+
+def call(function, apikey, priority, params, decode, stream=False):
+    """Function sends a call through the scheduler and returns the answer decoded by decode(response),
+    which returns (data, bytes downloaded)"""
+    keys = keys_of(apikey)
+    for attempt in range(RETRIES + len(keys)):
+        queued = time.perf_counter()
+        # The throttled key is blocked for a minute, so the retry goes to another key of the pool if there is one
+        allowed, key = scheduler.acquire_any(keys, priority)
+        if not allowed:
+            metrics.inc("alphavantage_requests_total", function=function, outcome="daily budget used up")
+            # Same payload AlphaVantage sends, so the callers handle it like any other exceeded limit
+            return {"Note": "Daily AlphaVantage call budget used up"}
+        label = scheduler.label(key)
+        metrics.observe("alphavantage_queue_seconds", time.perf_counter() - queued, key=label)
+        start = time.perf_counter()
+        try:
+            r = get_session().get(BASE_URL, params={"function": function, **params, "apikey": key},
+                                  timeout=TIMEOUT, stream=stream)
+            received = time.perf_counter()
+            data, size = decode(r)
+        except Exception as error:  # Network errors, timeouts, no json (e.g. an html error page)
+            metrics.inc("alphavantage_requests_total", function=function, outcome=type(error).__name__)
+            raise
+        decoded = time.perf_counter()
+        metrics.observe("alphavantage_request_seconds", received - start, function=function)
+        metrics.observe("alphavantage_decode_seconds", decoded - received, function=function)
+        metrics.inc("alphavantage_response_bytes_total", size, function=function)
+        outcome = "note" if "Note" in data else "error message" if "Error Message" in data else "ok"
+        metrics.inc("alphavantage_requests_total", function=function, outcome=outcome)
+        logger.debug("%s %s took %.3f s with %s", function, params, decoded - start, label)
+        if "Note" not in data:
+            break
+        metrics.inc("alphavantage_notes_total", key=label)
+        logger.info("%s was throttled by AlphaVantage on %s (attempt %d)", function, label, attempt + 1)
+        scheduler.throttled(key)
+    return data
+
+
+def submit(function, apikey, priority=INTERACTIVE, **params):
+    """Function starts query in the background and returns a Future of the decoded json"""
+    return executor.submit(query, function, apikey, priority, **params)
+
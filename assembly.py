@@ -1,159 +1,16 @@
 import os
-from dotenv import load_dotenv, find_dotenv
-import requests
 from PyQt5 import QtCore, QtGui, QtWidgets
 import pyqtgraph as pg
-import csv
-from datetime import datetime
-from datetime import timedelta
-
-# Find and insert the API KEY ("hiding the API KEY"), 2 different keys for main window and search engine
-load_dotenv(find_dotenv())
-API_KEY = os.environ.get('OPX_KEY')
-IPA_KEY = os.environ.get('QTW_KEY')
-
-def get_day_difference(start, end):
-    start = datetime.strptime(start, "%Y-%m-%d")
-    end = datetime.strptime(end, "%Y-%m-%d")
-    return (end - start).days
-
-def get_graph(symbol, start, end):
-    """Function returns a list of all closure prices for a stock (symbol) in the given time frame (start, end)"""
-    start = datetime.strptime(start, "%Y-%m-%d")
-    end = datetime.strptime(end, "%Y-%m-%d")
-    difference = (end - start).days
-    start = datetime.strftime(start, "%Y-%m-%d")
-    end = datetime.strftime(end, "%Y-%m-%d")
-
-    prices = []
-
-    if difference <= 140:
-        # Get the json for Times Series Daily Adjusted
-        r = requests.get(
-            f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY_ADJUSTED&symbol={symbol}&outputsize=full&apikey={API_KEY}"
-        )
-        # Catch error if json does not exist
-        if "Error Message" in r.json():  # A new way to handle Errors, so I do not have to use try, except!
-            print("Symbol does not exist")  # r.json form AlphaVantage contains an "Error Message" I can catch
-            return [0]
-        elif "Note" in r.json():
-            print("API call limit exceeded")
-            return [0]
-        n = 0
-        while n < difference:
-            try:
-                prices.append(float(r.json()['Time Series (Daily)'][start]['5. adjusted close']))   # Append closure price
-            except KeyError:    # Ignoring the KeyError of Non-Trading Days
-                pass
-            start = datetime.strptime(start, "%Y-%m-%d")    # Change format so I can add a day
-            start += timedelta(days=1)                      # Add day
-            start = datetime.strftime(start, "%Y-%m-%d")    # Change back format so api can interpret properly
-            n += 1
-        return prices
-    else:
-        # Get the json for Times Series Weekly Adjusted
-        r = requests.get(
-            f"https://www.alphavantage.co/query?function=TIME_SERIES_WEEKLY_ADJUSTED&symbol={symbol}&outputsize=full&apikey={API_KEY}"
-        )
-        # Catch error if json does not exist
-        if "Error Message" in r.json():  # A new way to handle Errors, so I do not have to use try, except!
-            print("Symbol does not exist")  # r.json form AlphaVantage contains an "Error Message" I can catch
-            return [0]
-        elif "Note" in r.json():
-            print("API call limit exceeded")
-            return [0]
-        n = 0
-        while n < difference:
-            try:
-                prices.append(
-                    float(r.json()['Weekly Adjusted Time Series'][start]['5. adjusted close']))  # Append closure price
-                start = datetime.strptime(start, "%Y-%m-%d")  # Change format so I can add a day
-                start += timedelta(days=7)  # Add 7 days to get the value for the next week!
-                start = datetime.strftime(start, "%Y-%m-%d")  # Change back format so api can interpret properly
-                n += 7  # Adding 7 days to the day counter n
-            except KeyError:  # Ignoring the KeyError of Non-Trading Days
-                start = datetime.strptime(start, "%Y-%m-%d")  # Change format so I can add a day
-                start += timedelta(days=1)  # Add one single day to catch beginning of the week
-                start = datetime.strftime(start, "%Y-%m-%d")  # Change back format so api can interpret properly
-                n += 1  # Adding 1 day to the day counter n
-                pass
-        return prices
-
-def get_infos(symbol):
-    """Function returns a dictionary with all the important information"""
-    # Changed to demo right now!
-    r_general = requests.get(
-        f"https://www.alphavantage.co/query?function=SYMBOL_SEARCH&keywords={symbol}&apikey={API_KEY}"
-    )
-    r_price = requests.get(
-        f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={API_KEY}"
-    )
-    # Catch the errors in both requests:
-    if "Error Message" in r_general.json() or "Error Message" in r_price.json():
-        return {
-            "name": "NA",
-            "price": "NA",
-            "currency": "NA",
-            "updated": "NA",
-            "region": "NA",
-            "error message": "Ticker Symbol not found!"
-        }
-    elif r_general.json()['bestMatches'] == []:
-        return {
-            "name": "NA",
-            "price": "NA",
-            "currency": "NA",
-            "updated": "NA",
-            "region": "NA",
-            "error message": "Ticker Symbol not found!"
-        }
-    elif "Note" in r_general.json() or "Note" in r_price.json():
-        return {
-            "name": "NA",
-            "price": "NA",
-            "currency": "NA",
-            "updated": "NA",
-            "region": "NA",
-            "error message": "AlphaVantage API Call frequency exceeded!"
-        }
-    else:
-        return {
-            "name": r_general.json()['bestMatches'][0]['2. name'],
-            "price": round(float(r_price.json()['Global Quote']['05. price']), 2),
-            "currency": r_general.json()['bestMatches'][0]['8. currency'],
-            "updated": r_price.json()['Global Quote']['07. latest trading day'],
-            "region": r_general.json()['bestMatches'][0]['4. region'],
-            "error message": ""
-        }
-
-def get_search_results(keyword):
-    """Function returns a dictionary with all the important information"""
-    # Changed to demo right now!
-    r = requests.get(
-        f"https://www.alphavantage.co/query?function=SYMBOL_SEARCH&keywords={keyword}&apikey={IPA_KEY}"
-    )
-    return_list = []
-    # Catch the errors in both requests:
-    if "Error Message" in r.json():
-        return return_list
-    elif r.json()['bestMatches'] == []:
-        return return_list
-    elif "Note" in r.json():
-        return return_list
-    else:
-        for i in range(5):
-            row_list = []
-            try:
-                row_list.append(r.json()['bestMatches'][i]['9. matchScore'])
-                row_list.append(r.json()['bestMatches'][i]['2. name'])
-                row_list.append(r.json()['bestMatches'][i]['4. region'])
-                row_list.append(r.json()['bestMatches'][i]['3. type'])
-                row_list.append(r.json()['bestMatches'][i]['1. symbol'])
-                # Important to catch IndexErrors as well
-            except (KeyError, IndexError):
-                break
-            return_list.append(row_list)
-        return return_list
+import alphavantage
+import numpy as np
+from workers import Dispatcher
+from compare import align, rebase
+from indicators import IndicatorSet, INDICATORS
+from charts import draw_prices, draw_indicators, needs_indicator_plot
+import metrics
+# The data functions live in stockdata (no Qt), get_graph etc. can still be imported from here as well
+from stockdata import (get_graph, get_series, load_series, get_infos, get_quote, get_search_results,
+                       symbol_index, watch_list, WATCH_CALLS_PER_MINUTE, prefetcher, PREFETCH)
 
 # Search Window
 class Ui_SearchWindow(object):
@@ -219,6 +76,11 @@ class Ui_SearchWindow(object):
         self.verticalLayout.addLayout(self.verticalLayout_2)
         SearchWindow.setCentralWidget(self.centralwidget)
 
+        # Runs the search requests in the background so the window does not freeze
+        self.dispatcher = Dispatcher()
+        self.dispatcher.failed.connect(lambda owner, message: QtWidgets.QMessageBox.warning(
+            SearchWindow, "Warning", message))
+
         self.retranslateUi(SearchWindow)
         QtCore.QMetaObject.connectSlotsByName(SearchWindow)
 
@@ -242,10 +104,21 @@ class Ui_SearchWindow(object):
         # Call the search_button when the search button is clicked
         self.pushButton_search.clicked.connect(lambda: self.search_button(self.lineEdit_keyword.text()))
 
-    # Method calls the get_search_results function and inserts data into the table
+    # Method calls the get_search_results function in the background (a newer search replaces the running one)
+    # (the local symbol index answers right away, AlphaVantage is only asked if the local matches are just a guess,
+    # its results are merged into the index and replace the guess)
     def search_button(self, keyword):
         self.tableWidget_display.setRowCount(0)
-        list_list = get_search_results(keyword)
+        list_list, sure = symbol_index.lookup(keyword)
+        self.show_search_results(list_list)
+        if sure:
+            self.dispatcher.cancel("search")
+        else:
+            self.dispatcher.submit("search", lambda results: self.show_search_results(results or list_list),
+                                   get_search_results, keyword)
+
+    # Method inserts the search results into the table
+    def show_search_results(self, list_list):
         list_length = len(list_list)
         self.tableWidget_display.setRowCount(list_length)
         for i in range(list_length):
@@ -253,12 +126,194 @@ class Ui_SearchWindow(object):
                 self.tableWidget_display.setItem(i,j, QtWidgets.QTableWidgetItem(str(list_list[i][j])))
 
 
-ticker_list = []
-with open("symbols_2.txt", "r") as file:
-    csvreader = csv.reader(file, delimiter=",")
-    for row in csvreader:
-        for ticker in row:
-            ticker_list.append(ticker.strip())
+# Watch Window (latest quotes of the pinned symbols, refreshed in the background)
+class Ui_WatchWindow(object):
+    """Watch Window class: one GLOBAL_QUOTE call every 60 / WATCH_CALLS_PER_MINUTE seconds for the pinned symbol
+    with the oldest quote, a row is only repainted if its quote changed"""
+    COLUMNS = ["Symbol", "Price", "Change", "Updated", "Status"]
+
+    def setupUi(self, WatchWindow):
+        self.WatchWindow = WatchWindow
+        WatchWindow.setObjectName("WatchWindow")
+        WatchWindow.resize(800, 600)
+        WatchWindow.setWindowIcon(QtGui.QIcon('chart.png'))
+        self.centralwidget = QtWidgets.QWidget(WatchWindow)
+        self.centralwidget.setObjectName("centralwidget")
+        self.verticalLayout = QtWidgets.QVBoxLayout(self.centralwidget)
+        self.verticalLayout.setObjectName("verticalLayout")
+        # Symbol field with Pin and Unpin buttons
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.lineEdit_symbol = QtWidgets.QLineEdit(self.centralwidget)
+        font = QtGui.QFont()
+        font.setFamily("Arial")
+        self.lineEdit_symbol.setFont(font)
+        self.lineEdit_symbol.setObjectName("lineEdit_symbol")
+        self.horizontalLayout.addWidget(self.lineEdit_symbol)
+        self.pushButton_pin = QtWidgets.QPushButton(self.centralwidget)
+        self.pushButton_pin.setObjectName("pushButton_pin")
+        self.horizontalLayout.addWidget(self.pushButton_pin)
+        self.pushButton_unpin = QtWidgets.QPushButton(self.centralwidget)
+        self.pushButton_unpin.setObjectName("pushButton_unpin")
+        self.horizontalLayout.addWidget(self.pushButton_unpin)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        # Table with one row per pinned symbol
+        self.tableWidget_watch = QtWidgets.QTableWidget(self.centralwidget)
+        self.tableWidget_watch.setColumnCount(len(self.COLUMNS))
+        self.tableWidget_watch.setHorizontalHeaderLabels(self.COLUMNS)
+        self.tableWidget_watch.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tableWidget_watch.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tableWidget_watch.horizontalHeader().setStretchLastSection(True)
+        self.tableWidget_watch.setObjectName("tableWidget_watch")
+        self.verticalLayout.addWidget(self.tableWidget_watch)
+        WatchWindow.setCentralWidget(self.centralwidget)
+
+        # Quotes are loaded in the background with low priority, at most one call at a time
+        self.dispatcher = Dispatcher()
+        self.dispatcher.failed.connect(lambda owner, message: self.show_quote(self.refreshing, {"error message": message}))
+        self.refreshing = None      # Symbol whose quote is loading
+        self.rows = {}              # symbol -> row in the table
+        self.timer = QtCore.QTimer(WatchWindow)
+        self.timer.setInterval(int(60000 / WATCH_CALLS_PER_MINUTE))
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+        self.retranslateUi(WatchWindow)
+        QtCore.QMetaObject.connectSlotsByName(WatchWindow)
+        self.build_table()
+
+    def retranslateUi(self, WatchWindow):
+        _translate = QtCore.QCoreApplication.translate
+        WatchWindow.setWindowTitle(_translate("WatchWindow", "Watch List"))
+        self.lineEdit_symbol.setPlaceholderText(_translate("WatchWindow", "AAPL"))
+        self.pushButton_pin.setText(_translate("WatchWindow", "Pin"))
+        self.pushButton_pin.setShortcut(_translate("WatchWindow", "Return"))
+        self.pushButton_unpin.setText(_translate("WatchWindow", "Unpin selected"))
+
+        self.pushButton_pin.clicked.connect(lambda: self.pin(self.lineEdit_symbol.text()))
+        self.pushButton_unpin.clicked.connect(lambda: self.unpin_selected())
+
+    def pin(self, symbol):
+        # The timer refreshes a new symbol next (it has no quote yet), so pinning never adds calls to the pacing
+        if watch_list.pin(symbol):
+            self.build_table()
+        self.lineEdit_symbol.clear()
+
+    def unpin_selected(self):
+        for index in self.tableWidget_watch.selectionModel().selectedRows():
+            watch_list.unpin(self.tableWidget_watch.item(index.row(), 0).text())
+        self.build_table()
+
+    # Method fills the table once for all pinned symbols (only needed when a symbol is pinned or unpinned)
+    def build_table(self):
+        symbols = watch_list.symbols()
+        self.rows = {symbol: i for i, symbol in enumerate(symbols)}
+        self.tableWidget_watch.setRowCount(len(symbols))
+        for symbol, i in self.rows.items():
+            for j in range(len(self.COLUMNS)):
+                self.tableWidget_watch.setItem(i, j, QtWidgets.QTableWidgetItem())
+            self.paint_row(symbol)
+
+    # Method updates the texts of one row (cells whose text did not change are left alone)
+    def paint_row(self, symbol):
+        row = watch_list.row(symbol)
+        texts = [symbol, str(row["price"]), row["change percent"], row["updated"], row["error message"]]
+        for j, text in enumerate(texts):
+            item = self.tableWidget_watch.item(self.rows[symbol], j)
+            if item.text() != text:
+                item.setText(text)
+
+    # Method is called by the timer: requests the quote of the symbol with the oldest quote
+    # (skipped while the window is closed or the previous quote is still loading -> calls per minute stay fixed)
+    def refresh(self):
+        if not self.WatchWindow.isVisible() or self.dispatcher.pending("watch"):
+            return
+        symbol = watch_list.next_due()
+        if symbol is None:
+            return
+        self.refreshing = symbol
+        self.dispatcher.submit("watch", lambda response: self.show_quote(symbol, response), get_quote, symbol)
+
+    def show_quote(self, symbol, response):
+        if watch_list.update(symbol, response) and symbol in self.rows:
+            self.paint_row(symbol)
+
+
+# Diagnostics Window (latency, downloaded bytes, cache hits and throttling of the AlphaVantage calls)
+class Ui_DiagnosticsWindow(object):
+    """Diagnostics Window class: shows the metrics (refreshed every 2 seconds) and exports them"""
+
+    def setupUi(self, DiagnosticsWindow):
+        self.DiagnosticsWindow = DiagnosticsWindow
+        DiagnosticsWindow.setObjectName("DiagnosticsWindow")
+        DiagnosticsWindow.resize(1000, 700)
+        DiagnosticsWindow.setWindowIcon(QtGui.QIcon('chart.png'))
+        self.centralwidget = QtWidgets.QWidget(DiagnosticsWindow)
+        self.centralwidget.setObjectName("centralwidget")
+        self.verticalLayout = QtWidgets.QVBoxLayout(self.centralwidget)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.textEdit_metrics = QtWidgets.QPlainTextEdit(self.centralwidget)
+        self.textEdit_metrics.setReadOnly(True)
+        self.textEdit_metrics.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+        self.textEdit_metrics.setObjectName("textEdit_metrics")
+        self.verticalLayout.addWidget(self.textEdit_metrics)
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.pushButton_json = QtWidgets.QPushButton(self.centralwidget)
+        self.pushButton_json.setObjectName("pushButton_json")
+        self.horizontalLayout.addWidget(self.pushButton_json)
+        self.pushButton_prometheus = QtWidgets.QPushButton(self.centralwidget)
+        self.pushButton_prometheus.setObjectName("pushButton_prometheus")
+        self.horizontalLayout.addWidget(self.pushButton_prometheus)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        DiagnosticsWindow.setCentralWidget(self.centralwidget)
+
+        self.timer = QtCore.QTimer(DiagnosticsWindow)
+        self.timer.setInterval(2000)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+        self.retranslateUi(DiagnosticsWindow)
+        QtCore.QMetaObject.connectSlotsByName(DiagnosticsWindow)
+        self.refresh()
+
+    def retranslateUi(self, DiagnosticsWindow):
+        _translate = QtCore.QCoreApplication.translate
+        DiagnosticsWindow.setWindowTitle(_translate("DiagnosticsWindow", "Diagnostics"))
+        self.pushButton_json.setText(_translate("DiagnosticsWindow", "Export JSON"))
+        self.pushButton_prometheus.setText(_translate("DiagnosticsWindow", "Export Prometheus"))
+
+        self.pushButton_json.clicked.connect(lambda: self.export("metrics.json", "JSON (*.json)"))
+        self.pushButton_prometheus.clicked.connect(lambda: self.export("metrics.prom", "Prometheus (*.prom *.txt)"))
+
+    # Method shows one line per metric and labels (histograms as count, mean and bucket of the 50/95 % quantile)
+    def refresh(self):
+        if not self.DiagnosticsWindow.isVisible():
+            return
+        lines = []
+        for name, samples in metrics.metrics.snapshot().items():
+            lines.append(name)
+            for sample in samples:
+                labels = ", ".join(f"{key}={value}" for key, value in sample["labels"].items())
+                if "buckets" in sample:
+                    seconds = name.endswith("_seconds")
+                    unit, scale = ("ms", 1e3) if seconds else ("", 1)
+                    lines.append(f"    {labels:<50} count {sample['count']:>6}   mean {sample['mean'] * scale:9.1f} {unit}"
+                                 f"   p50 <= {sample['p50'] * scale:g} {unit}   p95 <= {sample['p95'] * scale:g} {unit}")
+                else:
+                    lines.append(f"    {labels:<50} {sample['value']}")
+        text = "\n".join(lines) or "No AlphaVantage calls yet"
+        if text != self.textEdit_metrics.toPlainText():
+            scroll = self.textEdit_metrics.verticalScrollBar().value()
+            self.textEdit_metrics.setPlainText(text)
+            self.textEdit_metrics.verticalScrollBar().setValue(scroll)
+
+    def export(self, default_name, file_filter):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self.DiagnosticsWindow, "Export Metrics", default_name,
+                                                        file_filter)
+        if path:
+            metrics.export(path)
+
 
 # Main Window which is started up when I run the application
 class Ui_MainWindow(object):
@@ -307,7 +362,8 @@ class Ui_MainWindow(object):
         self.lineEdit_quote.setObjectName("lineEdit_quote")
 
         # self.completer uses a list of US, GER stocks at the moment derived from txt field mentioned above
-        self.completer = QtWidgets.QCompleter(ticker_list)                      # completer uses ticker_list
+        # (the list is filled in the background once the window is shown, see warm_up)
+        self.completer = QtWidgets.QCompleter([])                               # completer uses symbols_2.txt
         self.completer.setCaseSensitivity(QtCore.Qt.CaseInsensitive)            # Case insensitive
         self.completer.setCompletionMode(QtWidgets.QCompleter.PopupCompletion)  # Styling
         self.lineEdit_quote.setCompleter(self.completer)                        # Set completer so it bleongs to lineEdit
@@ -368,11 +424,30 @@ class Ui_MainWindow(object):
         # Adding the graphWidget (object of class PlotWidget) + Personalizing
         pg.setConfigOption('background', 'w')
         pg.setConfigOption('foreground', 'k')
-        self.graphWidget = pg.PlotWidget(self.widget)
+        self.graphWidget = pg.PlotWidget(self.widget, axisItems={"bottom": pg.DateAxisItem()})
         self.graphWidget.setObjectName("graphWidget")
-        self.graphWidget.setLabel("bottom", text="Trading Days")
+        self.graphWidget.setLabel("bottom", text="Date")
+        # Always the full daily series: only a min/max view sized to the pixel width of the widget is drawn,
+        # zooming in re-decimates the visible part from the full resolution data
+        self.graphWidget.setDownsampling(auto=True, mode="peak")
+        self.graphWidget.setClipToView(True)
         self.graphWidget.setLabel("left", text="Price")
+        self.legend = self.graphWidget.addLegend()                                 # Shows the compared symbols
         self.verticalLayout_3.addWidget(self.graphWidget)
+        # Second graph below for the indicators which do not share the price scale (RSI, volatility, ...)
+        self.indicatorWidget = pg.PlotWidget(self.widget, axisItems={"bottom": pg.DateAxisItem()})
+        self.indicatorWidget.setObjectName("indicatorWidget")
+        self.indicatorWidget.setXLink(self.graphWidget)                          # Zooms together with the price
+        self.indicatorWidget.setDownsampling(auto=True, mode="peak")
+        self.indicatorWidget.setClipToView(True)
+        self.indicatorWidget.setLabel("left", text="%")
+        self.indicatorWidget.setMaximumHeight(200)
+        self.indicatorWidget.addLegend()
+        self.indicatorWidget.hide()
+        self.verticalLayout_3.addWidget(self.indicatorWidget)
+        self.graph = None           # (symbol, full daily series) of the single graph which is shown
+        self.graph_range = None
+        self.indicators = {}        # symbol -> IndicatorSet of its daily series
         # Setting up verticalLayout_2 (righter lower box)
         # and horizontalLayout_2 (top box of that box containing "From/To" Labels
         self.verticalLayout_2 = QtWidgets.QVBoxLayout()
@@ -430,6 +505,12 @@ class Ui_MainWindow(object):
         self.pushButton_graph = QtWidgets.QPushButton(self.widget)
         self.pushButton_graph.setObjectName("pushButton_graph")
         self.verticalLayout_2.addWidget(self.pushButton_graph)
+        # Compare PushButton (adds the symbols of the lineEdit to the graph, rebased to 100 at the start date)
+        self.pushButton_compare = QtWidgets.QPushButton(self.widget)
+        self.pushButton_compare.setObjectName("pushButton_compare")
+        self.verticalLayout_2.addWidget(self.pushButton_compare)
+        self.compare_series = {}    # symbol -> full daily series (None while it is loading), in the order added
+        self.compare_range = None
         self.verticalLayout_3.addLayout(self.verticalLayout_2)
         self.horizontalLayout_3.addLayout(self.verticalLayout_3)
 
@@ -461,12 +542,39 @@ class Ui_MainWindow(object):
         self.actionTickers.setShortcut("Ctrl+F")
         self.actionTickers.setObjectName("actionTickers")
         self.menuSearch.addAction(self.actionTickers)
+        self.actionWatch = QtWidgets.QAction(MainWindow)
+        self.actionWatch.setShortcut("Ctrl+W")
+        self.actionWatch.setObjectName("actionWatch")
+        self.menuFile.addAction(self.actionWatch)
+        self.actionPin = QtWidgets.QAction(MainWindow)
+        self.actionPin.setShortcut("Ctrl+P")
+        self.actionPin.setObjectName("actionPin")
+        self.menuFile.addAction(self.actionPin)
+        self.watch_window = None
+        # Options -> Diagnostics and one checkable entry per indicator, drawn on top of the graph
+        self.actionDiagnostics = QtWidgets.QAction(MainWindow)
+        self.actionDiagnostics.setObjectName("actionDiagnostics")
+        self.menuOptions.addAction(self.actionDiagnostics)
+        self.menuOptions.addSeparator()
+        self.diagnostics_window = None
+        self.indicator_actions = {}
+        for name in INDICATORS.values():
+            action = QtWidgets.QAction(MainWindow)
+            action.setCheckable(True)
+            action.setText(name)
+            self.menuOptions.addAction(action)
+            self.indicator_actions[name] = action
 
         self.menubar.addAction(self.menuFile.menuAction())
         self.menubar.addAction(self.menuOptions.menuAction())
         self.menubar.addAction(self.menuHelp.menuAction())
         self.menubar.addAction(self.menuSearch.menuAction())
 
+        # Runs the AlphaVantage requests in the background and delivers the results to the widgets
+        self.dispatcher = Dispatcher()
+        self.dispatcher.failed.connect(lambda owner, message: QtWidgets.QMessageBox.warning(
+            MainWindow, "Warning", message))
+
         self.retranslateUi(MainWindow)
         QtCore.QMetaObject.connectSlotsByName(MainWindow)
 
@@ -492,12 +600,17 @@ class Ui_MainWindow(object):
         self.label_change.setText(_translate("MainWindow", "± %"))
         self.label_end.setText(_translate("MainWindow", "                   To:"))
         self.pushButton_graph.setText(_translate("MainWindow", "Get Graph"))
+        self.pushButton_compare.setText(_translate("MainWindow", "Compare"))
+        self.pushButton_compare.setToolTip(_translate("MainWindow", "Add the symbol(s) to the graph, e.g. AAPL, BAYN.DE"))
         self.menuFile.setTitle(_translate("MainWindow", "File"))
         self.menuOptions.setTitle(_translate("MainWindow", "Options"))
         self.menuHelp.setTitle(_translate("MainWindow", "Help"))
         self.actionReadme.setText(_translate("MainWindow", "Readme"))
         self.actionTickers.setText(_translate("MainWindow", "Ticker Symbols"))
         self.menuSearch.setTitle(_translate("MainWindow", "Search"))
+        self.actionWatch.setText(_translate("MainWindow", "Watch List"))
+        self.actionPin.setText(_translate("MainWindow", "Pin Symbol to Watch List"))
+        self.actionDiagnostics.setText(_translate("MainWindow", "Diagnostics"))
 
         # Calling the method clicked_quote (defined below) once the pushButton_quote is pressed
         # arguments (symbol got form lineEdit) for the method have to be passed using a lambda (one line function) why?
@@ -509,12 +622,40 @@ class Ui_MainWindow(object):
             self.lineEdit_quote.text(), str(self.dateEdit_start.date().toPyDate()),
             str(self.dateEdit_end.date().toPyDate())))
 
+        # Calling the method clicked_compare (defined below) once the pushButton_compare is pressed
+        self.pushButton_compare.clicked.connect(lambda: self.clicked_compare(
+            self.lineEdit_quote.text(), str(self.dateEdit_start.date().toPyDate()),
+            str(self.dateEdit_end.date().toPyDate())))
+
+        # Redrawing the graph when an indicator is switched on or off
+        for action in self.indicator_actions.values():
+            action.toggled.connect(lambda checked: self.draw_graph())
+
         # Calling the Readme method
         self.actionReadme.triggered.connect(lambda: self.readme())
 
         # Calling the Search Box
         self.actionTickers.triggered.connect(lambda: self.search())
 
+        # Opening the Watch List (Pin adds the symbol of the lineEdit first)
+        self.actionWatch.triggered.connect(lambda: self.watch())
+        self.actionPin.triggered.connect(lambda: self.watch(self.lineEdit_quote.text()))
+
+        # Opening the Diagnostics
+        self.actionDiagnostics.triggered.connect(lambda: self.diagnostics())
+
+    # Method is called right after the window is shown: loads the ticker list of the completer and opens
+    # the connection to AlphaVantage in the background, so neither delays the first window
+    # (then the prefetcher starts downloading the most used series whenever the user is idle)
+    def warm_up(self):
+        self.dispatcher.submit("completer", self.set_tickers, symbol_index.tickers)
+        alphavantage.executor.submit(alphavantage.warm_up)
+        if PREFETCH:
+            prefetcher.start()
+
+    def set_tickers(self, tickers):
+        self.completer.setModel(QtCore.QStringListModel(tickers, self.completer))
+
     def readme(self):
         os.system('start readme.txt')
 
@@ -525,9 +666,33 @@ class Ui_MainWindow(object):
         self.ui.setupUi(self.window)
         self.window.show()
 
-
+    def diagnostics(self):
+        if self.diagnostics_window is None:
+            self.diagnostics_window = QtWidgets.QMainWindow()
+            self.diagnostics_ui = Ui_DiagnosticsWindow()
+            self.diagnostics_ui.setupUi(self.diagnostics_window)
+        self.diagnostics_window.show()
+        self.diagnostics_window.raise_()
+        self.diagnostics_ui.refresh()
+
+    # The watch window is created once, so its timer and table survive closing and reopening it
+    def watch(self, symbol=""):
+        if self.watch_window is None:
+            self.watch_window = QtWidgets.QMainWindow()
+            self.watch_ui = Ui_WatchWindow()
+            self.watch_ui.setupUi(self.watch_window)
+        self.watch_window.show()
+        self.watch_window.raise_()
+        if symbol.strip():
+            self.watch_ui.pin(symbol)
+
+
+    # get_infos is called in the background, pressing the button again replaces the running request
     def clicked_quote(self, symbol):
-        response = get_infos(symbol)
+        prefetcher.record(symbol)
+        self.dispatcher.submit("quote", self.show_quote, get_infos, symbol)
+
+    def show_quote(self, response):
         self.label_name.setText(f" Company: {response['name']}")
         self.label_name.adjustSize()
         self.label_price.setText(f"Price: {str(response['price'])}")
@@ -544,27 +709,121 @@ class Ui_MainWindow(object):
             warning = QtWidgets.QMessageBox.warning(MainWindow, "Warning", response['error message'])
 
 
-    # Method which plots a list (just x values!) into the graphWidget in colour red (called when button is pressed)
+    # Method which plots the daily prices over the dates into the graphWidget in colour red (called when button is pressed)
     # Clear="True" clears all plots before displaying new plot
     def clicked_graph(self, symbol, start, end):
-        # Adjusting whether days or weeks are displayed (days = default)
-        if get_day_difference(start, end) > 140:
-            self.graphWidget.setLabel("bottom", text="Trading Weeks")
-        graph_list = get_graph(symbol, start, end)
-        if graph_list == [0]:
-            warning = QtWidgets.QMessageBox.warning(MainWindow, "Warning", "API call limit exceeded ")
+        # A single graph ends the comparison
+        for compared in self.compare_series:
+            self.dispatcher.cancel(f"compare {compared}")
+        self.compare_series = {}
+        self.graph_range = (start, end)
+        prefetcher.record(symbol)
+        self.dispatcher.submit("graph", lambda response: self.show_graph(symbol, response),
+                               load_series, symbol, "daily")
+
+    def show_graph(self, symbol, response):
+        series, error = response
+        if series is None:
+            warning = QtWidgets.QMessageBox.warning(MainWindow, "Warning", error)
+        elif len(series.slice(*self.graph_range)) == 0:
+            warning = QtWidgets.QMessageBox.warning(MainWindow, "Warning", "No trading days in the given time frame!")
+        else:
+            self.graph = (symbol, series)
+            self.draw_graph()
+
+    # Method draws the single graph in the time frame together with the indicators checked in the Options menu
+    def draw_graph(self):
+        if self.graph is None:
+            return
+        symbol, series = self.graph
+        start, end = self.graph_range
+        window = series.slice(start, end)
+        prices = window["adjusted_close"]
+        change_percent = round((prices[-1] - prices[0])/prices[0]*100, 2)
+        x = draw_prices(self.graphWidget, window)
+        self.label_change.setText(f"{str(change_percent)} %")
+
+        checked = [name for name in INDICATORS.values() if self.indicator_actions[name].isChecked()]
+        self.indicatorWidget.clear()
+        self.indicatorWidget.setVisible(needs_indicator_plot(checked))
+        if not checked:
+            return
+        # Indicators are computed over the whole series (so a moving average is defined from the start date on),
+        # a refreshed series only adds its new bars
+        if symbol in self.indicators:
+            self.indicators[symbol].update(series.dates, series["adjusted_close"])
+        else:
+            self.indicators[symbol] = IndicatorSet(series.dates, series["adjusted_close"])
+        draw_indicators(self.graphWidget, self.indicatorWidget, x, self.indicators[symbol], checked, start, end)
+
+    # Method adds the symbols of the lineEdit (comma separated) to the comparison, only new symbols are fetched
+    # (all at the same time), the ones already in the graph are just redrawn for the new time frame
+    def clicked_compare(self, text, start, end):
+        self.compare_range = (start, end)
+        self.graph = None
+        self.indicatorWidget.hide()
+        for symbol in [symbol.strip().upper() for symbol in text.split(",") if symbol.strip()]:
+            if symbol not in self.compare_series:
+                prefetcher.record(symbol)
+                self.compare_series[symbol] = None
+                self.dispatcher.submit(f"compare {symbol}",
+                                       lambda response, symbol=symbol: self.add_comparison(symbol, response),
+                                       load_series, symbol, "daily")
+        self.show_comparison()
+
+    def add_comparison(self, symbol, response):
+        series, error = response
+        if symbol not in self.compare_series:   # Comparison was ended in the meantime
+            return
+        if series is None:
+            del self.compare_series[symbol]
+            warning = QtWidgets.QMessageBox.warning(MainWindow, "Warning", f"{symbol}: {error}")
         else:
-            change_percent = round((graph_list[-1] - graph_list[0])/graph_list[0]*100, 2)
-            self.graphWidget.plot(graph_list, pen="r", clear="True")
-            self.graphWidget.showGrid(x=True, y=True)
-            self.label_change.setText(f"{str(change_percent)} %")
+            self.compare_series[symbol] = series
+        self.show_comparison()
+
+    # Method plots all compared symbols aligned on their common trading days and rebased to 100 at the start date
+    def show_comparison(self):
+        start, end = self.compare_range
+        windows = {symbol: series.slice(start, end) for symbol, series in self.compare_series.items()
+                   if series is not None}
+        windows = {symbol: window for symbol, window in windows.items() if len(window)}
+        if not windows:
+            return
+        dates, matrix = align(list(windows.values()))
+        rebased = rebase(matrix)
+        x = dates.astype("datetime64[s]").astype(np.float64)
+        self.graphWidget.clear()
+        for j, symbol in enumerate(windows):
+            change_percent = round(rebased[-1, j] - 100, 2)
+            self.graphWidget.plot(x, rebased[:, j], pen=pg.intColor(j, hues=max(len(windows), 9)),
+                                  name=f"{symbol} ({change_percent:+} %)", connect="finite", autoDownsampleFactor=1.0)
+        self.graphWidget.setLabel("left", text="Performance (100 = start)")
+        self.graphWidget.showGrid(x=True, y=True)
+        self.label_change.setText(f"{str(round(rebased[-1, 0] - 100, 2))} %")
 
 # Starting up the Application + ensuring that it is closed properly!
 if __name__ == "__main__":
     import sys
+    import logging
+    # STOCK_LOG_LEVEL=DEBUG prints the latency of every AlphaVantage call
+    logging.basicConfig(level=os.environ.get('STOCK_LOG_LEVEL', 'WARNING'))
+    # Headless batch mode: python assembly.py batch <watchlist> <output> (see batch.py for the options)
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        import batch
+        sys.exit(batch.main(sys.argv[2:]))
+    # Portfolio valuation: python assembly.py portfolio <holdings> (see portfolio.py for the options)
+    if len(sys.argv) > 1 and sys.argv[1] == "portfolio":
+        import portfolio
+        sys.exit(portfolio.main(sys.argv[2:]))
+    # Charts and summary of a watchlist to files: python assembly.py export <watchlist> <directory> (see export.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        import export
+        sys.exit(export.main(sys.argv[2:]))
     app = QtWidgets.QApplication(sys.argv)
     MainWindow = QtWidgets.QMainWindow()
     ui = Ui_MainWindow()
     ui.setupUi(MainWindow)
     MainWindow.show()
+    QtCore.QTimer.singleShot(0, ui.warm_up)
     sys.exit(app.exec_())
@@ -0,0 +1,175 @@
+import os
+import sys
+import csv
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from stockdata import get_infos, load_series
+from ratelimit import BACKGROUND
+import metrics
+
+# Columns of the result file
+FIELDS = ["symbol", "name", "price", "currency", "updated", "region",
+          "first_date", "last_date", "trading_days", "change_percent", "error message"]
+
+
+def read_watchlist(path):
+    """Function returns the symbols of a watchlist file (comma separated like symbols_2.txt)"""
+    symbols = []
+    with open(path, "r") as file:
+        for row in csv.reader(file, delimiter=","):
+            for ticker in row:
+                if ticker.strip() and ticker.strip() not in symbols:
+                    symbols.append(ticker.strip())
+    return symbols
+
+
+def fetch_symbol(symbol, start, end):
+    """Function returns the result row (quote + price series in the time frame) of one symbol
+    (background priority: a GUI running at the same time goes first)"""
+    row = dict(get_infos(symbol, BACKGROUND), symbol=symbol)
+    series, error = load_series(symbol, "daily", BACKGROUND, start=start)   # Only the time frame is downloaded
+    if series is None:
+        row["error message"] = row["error message"] or error
+        return row
+    prices = series.slice(start, end)
+    if len(prices):
+        close = prices["adjusted_close"]
+        row["first_date"] = str(prices.dates[0])
+        row["last_date"] = str(prices.dates[-1])
+        row["trading_days"] = len(prices)
+        row["change_percent"] = round((close[-1] - close[0]) / close[0] * 100, 2)
+    return row
+
+
+class CsvWriter(object):
+    """Class appends the result rows to a csv file (every row is flushed, so nothing is lost on interruption)"""
+
+    def __init__(self, path, append):
+        new_file = not append or not os.path.exists(path)
+        self.file = open(path, "a" if append else "w", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=FIELDS, extrasaction="ignore")
+        if new_file:
+            self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter(object):
+    """Class writes the result rows to a parquet file in row groups (needs pyarrow),
+    a resumed run writes into a new part file next to the existing one"""
+
+    def __init__(self, path, append, rows_per_group=50):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow), use a .csv file instead")
+        self.pa = pyarrow
+        stem, extension = os.path.splitext(path)
+        part = 0
+        while append and os.path.exists(path):
+            part += 1
+            path = f"{stem}-{part}{extension}"
+        self.schema = pyarrow.schema([(field, pyarrow.string()) for field in FIELDS])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self.rows = []
+        self.rows_per_group = rows_per_group
+
+    def write(self, row):
+        self.rows.append({field: None if row.get(field) is None else str(row[field]) for field in FIELDS})
+        if len(self.rows) >= self.rows_per_group:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.writer.write_table(self.pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def run_batch(symbols, output, start, end, workers=4, resume=False):
+    """Function fetches quote and price series for every symbol with at most `workers` symbols in flight
+    and streams the rows to output (.csv or .parquet) as they complete, returns the throughput in symbols/min"""
+    checkpoint = output + ".checkpoint"
+    done = set()
+    if resume and os.path.exists(checkpoint):
+        with open(checkpoint, "r") as file:
+            done = {line.strip() for line in file if line.strip()}
+    todo = [symbol for symbol in symbols if symbol not in done]
+    print(f"{len(todo)} symbols to fetch ({len(done)} already done)", file=sys.stderr)
+
+    if output.endswith(".parquet"):
+        writer = ParquetWriter(output, append=resume)
+    else:
+        writer = CsvWriter(output, append=resume)
+    started = time.perf_counter()
+    finished = 0
+    with open(checkpoint, "a" if resume else "w") as checkpoint_file, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}    # future -> symbol
+        queue = iter(todo)
+        try:
+            while True:
+                # Keep the pipeline bounded, the rate limit decides how fast the workers can go anyway
+                for symbol in queue:
+                    pending[executor.submit(fetch_symbol, symbol, start, end)] = symbol
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    symbol = pending.pop(future)
+                    try:
+                        row = future.result()
+                    except Exception as error:  # e.g. network errors, the symbol is reported and skipped
+                        row = {"symbol": symbol, "error message": f"{type(error).__name__}: {error}"}
+                    writer.write(row)
+                    checkpoint_file.write(row["symbol"] + "\n")
+                    checkpoint_file.flush()
+                    finished += 1
+                    rate = finished / (time.perf_counter() - started) * 60
+                    print(f"[{finished}/{len(todo)}] {row['symbol']:<10} {row['error message'] or 'ok'} "
+                          f"({rate:.1f} symbols/min)", file=sys.stderr)
+        finally:
+            # Interrupted runs can be continued with --resume, the symbols still in flight are fetched again
+            for future in pending:
+                future.cancel()
+            writer.close()
+    elapsed = time.perf_counter() - started
+    throughput = finished / elapsed * 60 if elapsed > 0 else 0.0
+    print(f"Fetched {finished} symbols in {elapsed:.1f} s ({throughput:.1f} symbols/min)", file=sys.stderr)
+    return throughput
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch quotes and price series for a whole watchlist")
+    parser.add_argument("watchlist", help="file with comma separated ticker symbols (e.g. symbols_2.txt)")
+    parser.add_argument("output", help="result file (.csv or .parquet)")
+    parser.add_argument("--start", default=str(np.datetime64("today", "D") - 365), help="start date (YYYY-MM-DD)")
+    parser.add_argument("--end", default=str(np.datetime64("today", "D")), help="end date (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=4, help="symbols fetched at the same time")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run")
+    parser.add_argument("--metrics", help="write call latencies, cache hits and throttling to this file "
+                                          "(.json, or .prom for the Prometheus text format)")
+    args = parser.parse_args(argv)
+    try:
+        run_batch(read_watchlist(args.watchlist), args.output, args.start, args.end, args.workers, args.resume)
+    finally:
+        if args.metrics:
+            metrics.export(args.metrics)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import time
+import timeit
+import tempfile
+import tracemalloc
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from series import PriceSeries
+from indicators import IndicatorSet
+from store import write_series, read_series
+from portfolio import Portfolio
+from mock_server import make_time_series, start_server
+from stream import parse_response, CHUNK_SIZE
+
+# Run with "python benchmark.py", all payloads are generated locally (or served by the local mock server)
+# so no API calls are spent
+
+
+def best_of(function, number=5, repeat=5):
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def bench_parse():
+    print("Parse + slice of full histories (140 day window):")
+    payloads = {
+        "daily (20y)": ("Time Series (Daily)", json.dumps({"Time Series (Daily)": make_time_series(5200)})),
+        "weekly (20y)": ("Weekly Adjusted Time Series",
+                         json.dumps({"Weekly Adjusted Time Series": make_time_series(1050, step_days=7)})),
+    }
+    for name, (key, payload) in payloads.items():
+        parse = best_of(lambda: PriceSeries.from_json(json.loads(payload)[key]))
+        series = PriceSeries.from_json(json.loads(payload)[key])
+        window = best_of(lambda: series.slice("2020-06-01", "2020-10-19"), number=1000)
+        print(f"    {name:<14} {len(payload) / 1e6:6.2f} MB   parse {parse * 1e3:8.2f} ms   slice {window * 1e6:8.2f} us")
+
+
+class ChunkedResponse(object):
+    """Stand-in for a streamed requests response, hands out a payload in chunks like the network would"""
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def iter_content(self, chunk_size):
+        for offset in range(0, len(self.payload), chunk_size):
+            yield self.payload[offset:offset + chunk_size]
+
+    def close(self):
+        pass
+
+
+def traced(function):
+    """Function returns (seconds, peak MB of the Python allocations) of one call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1e6
+
+
+def bench_ingest(bars=5200):
+    key = "Time Series (Daily)"
+    payload = json.dumps({"Meta Data": {"2. Symbol": "IBM"}, key: make_time_series(bars)}).encode()
+    print(f"Ingest of a full daily history ({len(payload) / 1e6:.2f} MB, {bars} trading days):")
+
+    def download_then_parse():
+        # requests keeps the whole answer (r.content), r.json() builds the dicts, then the columns are built
+        content = b"".join(ChunkedResponse(payload).iter_content(CHUNK_SIZE))
+        PriceSeries.from_json(json.loads(content)[key])
+
+    for name, function in (("json", download_then_parse),
+                           ("streamed", lambda: parse_response(ChunkedResponse(payload), key)),
+                           ("streamed 1y", lambda: parse_response(ChunkedResponse(payload), key, "2020-01-01"))):
+        seconds, peak = min(traced(function) for _ in range(3))
+        print(f"    {name:<12} {seconds * 1e3:8.2f} ms   peak memory {peak:6.2f} MB")
+
+
+def bench_indicators(symbols=300, bars=5200):
+    print(f"All indicators for {symbols} symbols x {bars} trading days (~20 years):")
+    rng = np.random.default_rng(0)
+    dates = np.datetime64("2000-01-03") + np.arange(bars + 1)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, size=(symbols, bars + 1)), axis=1))
+    start = time.perf_counter()
+    sets = [IndicatorSet(dates[:bars], close[:bars]) for close in closes]
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    for indicator_set, close in zip(sets, closes):
+        indicator_set.update(dates, close)  # One new bar from the cache refresh
+    incremental = time.perf_counter() - start
+    print(f"    full computation   {full:8.3f} s   ({full / symbols * 1e3:.2f} ms per symbol)")
+    print(f"    append one bar     {incremental:8.3f} s   ({incremental / symbols * 1e3:.2f} ms per symbol)")
+
+
+def resident_mb():
+    """Function returns (anonymous, file-backed) resident memory of the process in MB (Linux only, None elsewhere),
+    file-backed pages of a memory map are shared with the OS page cache and can be dropped at any time"""
+    try:
+        with open("/proc/self/status", "r") as file:
+            fields = dict(line.split(":", 1) for line in file)
+        return int(fields["RssAnon"].split()[0]) / 1e3, int(fields["RssFile"].split()[0]) / 1e3
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def bench_store(symbols=600, bars=5200):
+    print(f"Binary store with {symbols} symbols x {bars} trading days (open all, then one year of each):")
+    directory = tempfile.mkdtemp(prefix="stock-store-")
+    rng = np.random.default_rng(0)
+    dates = np.datetime64("2000-01-03") + np.arange(bars)
+    for n in range(symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, bars)))
+        columns = {"open": close, "high": close * 1.01, "low": close * 0.99, "close": close,
+                   "adjusted_close": close, "volume": rng.integers(10 ** 5, 10 ** 7, bars).astype(np.float64)}
+        series = PriceSeries(dates, columns)
+        write_series(os.path.join(directory, f"{n}.bin"), series)
+        series.save(os.path.join(directory, f"{n}.npz"))
+    for name, load in (("npz (copy)", lambda n: PriceSeries.load(os.path.join(directory, f"{n}.npz"))),
+                       ("memory map", lambda n: read_series(os.path.join(directory, f"{n}.bin")))):
+        before = resident_mb()
+        start = time.perf_counter()
+        loaded = [load(n) for n in range(symbols)]
+        opened = time.perf_counter() - start
+        last_year = sum(float(series.slice("2013-01-01", "2013-12-31")["close"].mean()) for series in loaded)
+        after = resident_mb()
+        memory = "n/a"
+        if before is not None:
+            memory = f"{after[0] - before[0]:6.1f} MB own + {after[1] - before[1]:6.1f} MB page cache"
+        print(f"    {name:<11} open all {opened * 1e3:7.1f} ms ({opened / symbols * 1e6:6.1f} us each)   "
+              f"resident: {memory}")
+        del loaded, last_year
+
+
+def bench_portfolio(positions=200, years=10):
+    print(f"Portfolio of {positions} positions in USD, EUR, GBX and CHF valued in EUR over {years} years:")
+    directory = tempfile.mkdtemp(prefix="stock-portfolio-")
+    rng = np.random.default_rng(0)
+    dates = np.arange(np.datetime64("2000-01-03"), np.datetime64("today", "D"))
+    dates = dates[np.is_busday(dates)]
+    suffixes = ["", ".DE", ".LON", ".SWI"]
+    holdings = [(f"S{n}{suffixes[n % 4]}", float(rng.integers(1, 500)), None) for n in range(positions)]
+    files = {}
+    for symbol, interval in [(symbol, "daily") for symbol, _, _ in holdings] + [("USDEUR", "fx"), ("GBPEUR", "fx"),
+                                                                                ("CHFEUR", "fx")]:
+        close = np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+        # Holidays differ per exchange -> every series misses a few random days
+        keep = rng.random(len(dates)) > 0.03
+        columns = {"close": close[keep]} if interval == "fx" else {"adjusted_close": 100 * close[keep]}
+        files[symbol] = os.path.join(directory, f"{symbol}.bin")
+        write_series(files[symbol], PriceSeries(dates[keep], columns))
+    start = str(np.datetime64("today", "D") - 365 * years)
+    portfolio = Portfolio(holdings, base="EUR")
+    load = best_of(lambda: portfolio.load(lambda symbol, interval: (read_series(files[symbol]), "")), 1, 3)
+    value = best_of(lambda: portfolio.value(start), 1, 5)
+    curve = best_of(lambda: portfolio.equity_curve(start), 1, 5)
+    print(f"    load from the cache {load * 1e3:8.1f} ms   value all positions {value * 1e3:8.1f} ms   "
+          f"equity curve {curve * 1e3:8.1f} ms")
+
+
+# Child processes for the startup measurements (each one starts with nothing imported), they print seconds
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+WINDOW_SCRIPT = """
+import time
+start = time.perf_counter()
+import assembly
+from PyQt5 import QtWidgets
+app = QtWidgets.QApplication([])
+assembly.MainWindow = QtWidgets.QMainWindow()
+ui = assembly.Ui_MainWindow()
+ui.setupUi(assembly.MainWindow)
+assembly.MainWindow.show()
+app.processEvents()     # First paint
+print(time.perf_counter() - start)
+"""
+
+
+def run_child(script, repeat=5):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    return min(float(subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True,
+                                    check=True).stdout.split()[-1]) for _ in range(repeat))
+
+
+def bench_startup():
+    print("Startup (fresh interpreter, best of 5):")
+    for module in ("stockdata", "assembly"):
+        print(f"    import {module:<12} {run_child(IMPORT_SCRIPT.format(module=module)) * 1e3:8.1f} ms")
+    print(f"    first window        {run_child(WINDOW_SCRIPT) * 1e3:8.1f} ms")
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1e3
+
+
+def bench_end_to_end(calls=40, workers=8, latency=0.02):
+    """Quote, graph and search through the whole client (rate limit, http, json, cache) against the mock server,
+    every call is a cache miss (fresh cache directory, each symbol once)"""
+    print(f"End to end against the mock server ({latency * 1e3:.0f} ms latency, {calls} calls each):")
+    server, url = start_server(latency=latency)
+    os.environ["STOCK_CACHE_DIR"] = tempfile.mkdtemp(prefix="stock-bench-")
+    import alphavantage
+    import stockdata
+    alphavantage.BASE_URL = url
+    for key in stockdata.KEYS:  # The mock server does not limit the calls
+        alphavantage.scheduler.configure(key, "bench", per_minute=10 ** 6, per_day=10 ** 9)
+    tickers = stockdata.symbol_index.tickers()
+    cases = {
+        "quote": lambda symbol: stockdata.get_infos(symbol),
+        "graph": lambda symbol: stockdata.load_series(symbol, "daily"),
+        "search": lambda symbol: stockdata.get_search_results(symbol[:-1]),
+    }
+    for n, (name, function) in enumerate(cases.items()):
+        symbols = iter(tickers[n * 2 * calls:(n + 1) * 2 * calls])
+        latencies = []
+        for symbol in [next(symbols) for _ in range(calls)]:
+            start = time.perf_counter()
+            function(symbol)
+            latencies.append(time.perf_counter() - start)
+        batch = [next(symbols) for _ in range(calls)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(function, batch))
+        throughput = calls / (time.perf_counter() - start)
+        print(f"    {name:<7} p50 {percentile(latencies, 50):8.2f} ms   p95 {percentile(latencies, 95):8.2f} ms   "
+              f"{throughput:8.1f} calls/s with {workers} threads")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    bench_startup()
+    bench_parse()
+    bench_ingest()
+    bench_indicators()
+    bench_store()
+    bench_portfolio()
+    bench_end_to_end()
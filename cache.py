@@ -0,0 +1,253 @@
+import os
+import re
+import atexit
+import threading
+import json
+import time
+import zipfile
+from series import PriceSeries
+from store import write_series, read_series
+
+
+class SeriesCache(object):
+    """Class stores downloaded time series per symbol and interval on disk, evicting the least recently used ones
+    (one binary file per series, loaded as memory map, see store.py)"""
+    FLUSH_SECONDS = 60
+
+    def __init__(self, directory="cache", max_bytes=200 * 1024 * 1024, max_age=6 * 60 * 60):
+        self.directory = directory
+        self.max_bytes = max_bytes      # Size cap for all cached series together
+        self.max_age = max_age          # Seconds until a cached series should be refreshed
+        self.index_path = os.path.join(directory, "index.json")
+        self.lock = threading.RLock()   # The series are loaded from the background workers
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False              # Access times changed since the index was written
+        self.written = time.monotonic()
+        self.index, readable = self._read_index()
+        if readable:    # With a broken index every series file would look like an orphan
+            self._remove_orphans()
+        atexit.register(self.flush)
+
+    def _read_index(self):
+        """Method returns (index, False if the index exists but could not be read)"""
+        try:
+            with open(self.index_path, "r") as file:
+                return json.load(file), True
+        except FileNotFoundError:       # No index yet -> start with an empty cache
+            return {}, True
+        except (OSError, ValueError):   # Broken index -> start with an empty cache, but keep the files
+            return {}, False
+
+    def _write_index(self):
+        # Written next to the index and then renamed, so a crash never leaves a half written index
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.index_path + ".tmp"
+        with open(path, "w") as file:
+            json.dump(self.index, file)
+        os.replace(path, self.index_path)
+        self.dirty = False
+        self.written = time.monotonic()
+
+    def flush(self):
+        """Method writes the access times of the loaded series (kept in memory, written at most every FLUSH_SECONDS)"""
+        with self.lock:
+            if self.dirty:
+                try:
+                    self._write_index()
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _key(symbol, interval):
+        # Symbols come straight from the lineEdit, so only keep characters which are safe in a file name
+        return f"{interval}_{re.sub(r'[^A-Z0-9._-]', '_', symbol.upper())}"
+
+    def _path(self, key):
+        # Every store writes a new file (a memory-mapped file cannot be replaced on Windows while it is in use),
+        # series cached before the binary store still point to their .npz file
+        return os.path.join(self.directory, self.index[key].get("file", key + ".npz"))
+
+    def _remove_orphans(self):
+        """Method deletes series files which are no longer in the index (replaced while they were mapped)"""
+        files = {entry.get("file", key + ".npz") for key, entry in self.index.items()}
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith((".bin", ".npz", ".tmp")) and name not in files:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:     # Still mapped by another instance of the application
+                    pass
+
+    def load(self, symbol, interval):
+        """Method returns the cached PriceSeries (memory-mapped, nothing is read yet) or None if it is not cached"""
+        key = self._key(symbol, interval)
+        with self.lock:
+            if key not in self.index:
+                self.misses += 1
+                return None
+            try:
+                if "file" in self.index[key]:
+                    series = read_series(self._path(key))
+                else:
+                    series = self._migrate(key)
+            except (OSError, ValueError, zipfile.BadZipFile):    # File was deleted or is corrupt -> forget about it
+                del self.index[key]
+                self._write_index()
+                self.misses += 1
+                return None
+            # Only the order of eviction depends on the access time, no need to write the index for every hit
+            self.index[key]["accessed"] = time.time()
+            self.dirty = True
+            if time.monotonic() - self.written > self.FLUSH_SECONDS:
+                self.flush()
+            self.hits += 1
+            return series
+
+    def _migrate(self, key):
+        """Method converts a series of the old .npz cache into the binary store (keeping its download time)"""
+        old_path = self._path(key)
+        series = PriceSeries.load(old_path)
+        self._write(key, series)
+        return read_series(self._path(key))
+
+    def _write(self, key, series):
+        old_path = self._path(key) if key in self.index else None
+        name = f"{key}.{time.time_ns()}.bin"
+        write_series(os.path.join(self.directory, name), series)
+        entry = self.index.setdefault(key, {"fetched": time.time(), "accessed": time.time()})
+        entry["file"] = name
+        entry["size"] = os.path.getsize(os.path.join(self.directory, name))
+        if old_path is not None:
+            self._remove(old_path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:     # Still mapped (Windows) -> removed with the orphans on the next start
+            pass
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.index),
+                "bytes": sum(entry["size"] for entry in self.index.values()),
+            }
+
+    def contains(self, symbol, interval):
+        with self.lock:
+            return self._key(symbol, interval) in self.index
+
+    def is_stale(self, symbol, interval):
+        with self.lock:
+            entry = self.index.get(self._key(symbol, interval))
+        return entry is None or time.time() - entry["fetched"] > self.max_age
+
+    def first_date(self, symbol, interval):
+        """Method returns the date (YYYY-MM-DD) from which on a series was downloaded, None for the full history"""
+        with self.lock:
+            entry = self.index.get(self._key(symbol, interval))
+        return entry.get("from") if entry is not None else None
+
+    def covers(self, symbol, interval, start=None):
+        """Method returns True if the cached series goes back to start (None: the full history is cached)"""
+        with self.lock:
+            entry = self.index.get(self._key(symbol, interval))
+        if entry is None:
+            return False
+        return entry.get("from") is None or (start is not None and str(start) >= entry["from"])
+
+    def store(self, symbol, interval, series, first_date=None):
+        """Method writes a series to disk and evicts the least recently used series if the size cap is exceeded,
+        returns the stored series as memory map (so the caller does not keep the downloaded copy in memory),
+        first_date: the series was only downloaded from this date on (None: full history)"""
+        key = self._key(symbol, interval)
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(key, series)
+            now = time.time()
+            self.index[key]["fetched"] = now
+            self.index[key]["accessed"] = now
+            self.index[key]["from"] = str(first_date) if first_date is not None else None
+            self._evict(keep=key)
+            self._write_index()
+            try:
+                return read_series(self._path(key))
+            except (OSError, ValueError):
+                return series
+
+    def _evict(self, keep):
+        total = sum(entry["size"] for entry in self.index.values())
+        # Oldest access first, the series which was just stored is never evicted
+        for key in sorted(self.index, key=lambda k: self.index[k]["accessed"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            path = self._path(key)
+            total -= self.index.pop(key)["size"]
+            self._remove(path)
+
+
+class TTLCache(object):
+    """Class keeps json-serializable values for a limited time, in memory and in a json file on disk
+    (used for the symbol search, negative results are kept for a shorter time)"""
+
+    def __init__(self, path, ttl=30 * 24 * 60 * 60, negative_ttl=24 * 60 * 60):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        try:
+            with open(path, "r") as file:
+                self.entries = json.load(file)   # key -> [expires, negative, value]
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, key):
+        """Method returns the cached value or None if there is none (or it has expired)"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.time():
+                self.misses += 1
+                return None
+            if entry[1]:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, negative=False):
+        with self.lock:
+            now = time.time()
+            self.entries[key] = [now + (self.negative_ttl if negative else self.ttl), negative, value]
+            # Expired entries are not worth writing to disk
+            self.entries = {key: entry for key, entry in self.entries.items() if entry[0] >= now}
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "w") as file:
+                    json.dump(self.entries, file)
+            except OSError:     # Still cached in memory
+                pass
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "hits": self.hits,
+                "negative hits": self.negative_hits,
+                "misses": self.misses,
+                "hit ratio": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+            }
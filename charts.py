@@ -0,0 +1,49 @@
+import numpy as np
+import pyqtgraph as pg
+from PyQt5 import QtCore
+from indicators import INDICATORS, PRICE_INDICATORS
+
+# Drawing of the single graph, shared by the main window and the headless export (export.py)
+
+
+def indicator_pen(name):
+    # Hue 0 is the red of the price, the indicators take the other hues
+    return pg.intColor(list(INDICATORS.values()).index(name) + 1, hues=len(INDICATORS) + 1)
+
+
+def draw_prices(plot, window):
+    """Function plots the adjusted close of a series window in red (clearing the plot), returns the x values"""
+    # DateAxisItem expects seconds since 1970
+    x = window.dates.astype("datetime64[s]").astype(np.float64)
+    # autoDownsampleFactor=1 -> about one min/max pair per pixel (pyqtgraph only starts at 5 samples per pixel)
+    plot.plot(x, window["adjusted_close"], pen="r", clear=True, autoDownsampleFactor=1.0)
+    plot.setLabel("left", text="Price")
+    plot.showGrid(x=True, y=True)
+    return x
+
+
+def draw_indicators(plot, indicator_plot, x, indicators, names, start, end):
+    """Function plots the indicators (names of INDICATORS) of an IndicatorSet: moving averages and bands
+    over the prices, the others (RSI, volatility, ...) in percent into the indicator plot"""
+    for (kind, window_days), name in INDICATORS.items():
+        if name not in names:
+            continue
+        pen = indicator_pen(name)
+        if kind == "bollinger":
+            for band in ("upper", "middle", "lower"):
+                plot.plot(x, indicators.window(f"{name} {band}", start, end),
+                          pen=pg.mkPen(pen, style=QtCore.Qt.DashLine),
+                          name=name if band == "upper" else None, autoDownsampleFactor=1.0)
+        elif kind in PRICE_INDICATORS:
+            plot.plot(x, indicators.window(name, start, end), pen=pen, name=name, autoDownsampleFactor=1.0)
+        else:
+            values = indicators.window(name, start, end)
+            if kind != "rsi":
+                values = values * 100   # Volatility, drawdown and returns in percent like the RSI scale
+            indicator_plot.plot(x, values, pen=pen, name=name, autoDownsampleFactor=1.0)
+    indicator_plot.showGrid(x=True, y=True)
+
+
+def needs_indicator_plot(names):
+    """Function returns True if one of the indicators does not share the price scale"""
+    return any(kind not in PRICE_INDICATORS for (kind, window_days), name in INDICATORS.items() if name in names)
@@ -0,0 +1,25 @@
+import numpy as np
+
+
+def align(series_list, column="adjusted_close"):
+    """Function aligns several PriceSeries on the union of their trading days and returns (dates, matrix)
+    with one column per series. Days on which an exchange was closed (holidays) carry the last price
+    forward, days before a series starts stay NaN."""
+    dates = np.unique(np.concatenate([series.dates for series in series_list]))
+    matrix = np.full((len(dates), len(series_list)), np.nan)
+    for j, series in enumerate(series_list):
+        matrix[np.searchsorted(dates, series.dates), j] = series[column]
+    return dates, forward_fill(matrix)
+
+
+def forward_fill(matrix):
+    """Function replaces NaN by the last valid value above it in the same column (vectorized)"""
+    rows = np.where(np.isnan(matrix), 0, np.arange(len(matrix))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)   # Row of the last valid value for every cell
+    return matrix[rows, np.arange(matrix.shape[1])]
+
+
+def rebase(matrix, base=100.0):
+    """Function scales every column so its first valid value equals base"""
+    first = np.argmax(~np.isnan(matrix), axis=0)
+    return matrix / matrix[first, np.arange(matrix.shape[1])] * base
@@ -0,0 +1,252 @@
+import os
+import re
+import sys
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import numpy as np
+from series import PriceSeries
+from indicators import IndicatorSet, INDICATORS
+from portfolio import listing_currency
+import metrics
+
+# Headless export of charts (png/svg) and a csv summary for a whole watchlist, e.g. for a daily scheduled run:
+#     python assembly.py export symbols_2.txt reports --formats png,svg --indicators "SMA 50,RSI 14"
+# Only cached series are used (no API calls) unless --fetch is given, the charts are rendered in a process pool.
+# The worker processes never import stockdata (only the main process reads and writes the cache)
+
+# Columns of the summary file
+FIELDS = ["symbol", "name", "price", "change_percent", "currency", "region",
+          "first_date", "last_date", "charts", "error message"]
+STAGES = ("fetch", "compute", "render", "write")
+
+metrics.metrics.describe("export_stage_seconds", "Time per symbol of the export stages (fetch, compute, render, write)")
+
+# Chart renderer of a worker process (created once per process by init_worker)
+renderer = None
+
+
+class ChartRenderer(object):
+    """Class draws the charts of one worker process into an offscreen widget (prices and the indicators
+    over the prices on top, RSI, volatility, ... below, like the main window) and exports them"""
+
+    def __init__(self, width=1200, height=700):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")    # No display needed
+        from PyQt5 import QtWidgets
+        import pyqtgraph as pg
+        import pyqtgraph.exporters
+        self.pg = pg
+        self.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+        pg.setConfigOption('background', 'w')
+        pg.setConfigOption('foreground', 'k')
+        self.widget = pg.GraphicsLayoutWidget()
+        self.widget.resize(width, height)
+        self.widget.show()      # Only a shown widget lays out its plots at its size (nothing is displayed offscreen)
+        self.width = width
+
+    def render(self, symbol, window, indicators, names, start, end, formats):
+        """Method draws one chart, returns {format: QImage or svg bytes}"""
+        from charts import draw_prices, draw_indicators, needs_indicator_plot
+        pg = self.pg
+        self.widget.clear()
+        plot = self.widget.addPlot(row=0, col=0, axisItems={"bottom": pg.DateAxisItem()})
+        plot.addLegend()
+        plot.setLabel("bottom", text="Date")
+        indicator_plot = None
+        if needs_indicator_plot(names):
+            indicator_plot = self.widget.addPlot(row=1, col=0, axisItems={"bottom": pg.DateAxisItem()})
+            indicator_plot.setXLink(plot)
+            indicator_plot.setLabel("left", text="%")
+            indicator_plot.setMaximumHeight(200)
+            indicator_plot.addLegend()
+        prices = window["adjusted_close"]
+        plot.setTitle(f"{symbol}   {round((prices[-1] - prices[0]) / prices[0] * 100, 2)} %   ({start} - {end})")
+        x = draw_prices(plot, window)
+        if names:
+            draw_indicators(plot, indicator_plot or plot, x, indicators, names, start, end)
+        self.app.processEvents()    # Lays out the plots in the widget
+        images = {}
+        for extension in formats:
+            if extension == "svg":
+                images[extension] = pg.exporters.SVGExporter(self.widget.scene()).export(toBytes=True)
+            else:
+                exporter = pg.exporters.ImageExporter(self.widget.scene())
+                exporter.parameters()["width"] = self.width
+                images[extension] = exporter.export(toBytes=True)
+        return images
+
+
+def init_worker(width, height):
+    global renderer
+    renderer = ChartRenderer(width, height)
+
+
+def file_name(symbol):
+    # Same characters as the cache files, BRK.B -> BRK.B.png
+    return re.sub(r"[^A-Z0-9._-]", "_", symbol.upper())
+
+
+def export_chart(job):
+    """Function computes, renders and writes the charts of one symbol in a worker process,
+    returns the summary values, the written files and the seconds of each stage"""
+    timings = {}
+    started = time.perf_counter()
+    series = PriceSeries(job["dates"], job["columns"])
+    window = series.slice(job["start"], job["end"])
+    result = {"symbol": job["symbol"], "files": [], "timings": timings}
+    if not len(window):
+        result["error message"] = "No trading days in the given time frame!"
+        return result
+    close = window["adjusted_close"]
+    result["price"] = round(float(window["close"][-1]), 2)
+    result["change_percent"] = round(float((close[-1] - close[0]) / close[0] * 100), 2)
+    result["first_date"] = str(window.dates[0])
+    result["last_date"] = str(window.dates[-1])
+    # Indicators over the whole series, so a moving average is defined from the start date on
+    indicators = IndicatorSet(series.dates, series["adjusted_close"]) if job["indicators"] else None
+    timings["compute"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    images = renderer.render(job["symbol"], window, indicators, job["indicators"], job["start"], job["end"],
+                             job["formats"])
+    timings["render"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for extension, image in images.items():
+        name = f"{file_name(job['symbol'])}.{extension}"
+        path = os.path.join(job["directory"], name)
+        if extension == "svg":
+            with open(path, "wb") as file:
+                file.write(image)
+        elif not image.save(path):
+            raise OSError(f"Could not write {path}")
+        result["files"].append(name)
+    timings["write"] = time.perf_counter() - started
+    return result
+
+
+def fetch_series(symbol, fetch=False):
+    """Function returns (series, error message, seconds), from the cache only unless fetch is set"""
+    from stockdata import series_cache, load_series
+    started = time.perf_counter()
+    if fetch:
+        series, error = load_series(symbol, "daily")
+    else:
+        series = series_cache.load(symbol, "daily")     # Stale series are fine, no call is spent
+        error = "" if series is not None else "Not cached (run with --fetch to download it)"
+    return series, error, time.perf_counter() - started
+
+
+def run_export(symbols, directory, start, end, formats=("png",), names=(), workers=None, fetch=False,
+               width=1200, height=700):
+    """Function writes a chart per symbol, summary.csv and index.json (list of all outputs and stage timings)
+    to directory, returns the summed seconds per stage"""
+    from stockdata import symbol_index
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    timings = {stage: 0.0 for stage in STAGES}
+    rows = {}
+    # Series are read (or downloaded) by threads, every series goes to the render processes as soon as it is there
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(width, height)) as pool:
+        # Starts the render processes before the fetching threads exist (forking a process with threads is unsafe)
+        pool.submit(os.getpid).result()
+        fetcher = ThreadPoolExecutor(max_workers=4 if fetch else 1)
+        fetches = {fetcher.submit(fetch_series, symbol, fetch): symbol for symbol in symbols}
+        charts = {}
+        for future in as_completed(fetches):
+            symbol = fetches[future]
+            info = symbol_index.info(symbol) or {}
+            rows[symbol] = {"symbol": symbol, "name": info.get("name", ""), "region": info.get("region", ""),
+                            "currency": ""}
+            try:
+                series, error, seconds = future.result()
+            except Exception as error:  # e.g. network errors with --fetch, the symbol is reported and skipped
+                series, error, seconds = None, f"{type(error).__name__}: {error}", 0.0
+            timings["fetch"] += seconds
+            metrics.metrics.observe("export_stage_seconds", seconds, stage="fetch")
+            if series is None:
+                rows[symbol]["error message"] = error
+                continue
+            # Only a symbol with prices gets a currency (the listing's guess would be wrong for a typo)
+            rows[symbol]["currency"] = listing_currency(symbol, symbol_index)
+            job = {"symbol": symbol, "dates": np.asarray(series.dates),
+                   "columns": {name: np.asarray(series[name]) for name in ("close", "adjusted_close")},
+                   "start": start, "end": end, "indicators": list(names), "formats": list(formats),
+                   "directory": directory}
+            charts[pool.submit(export_chart, job)] = symbol
+        for n, future in enumerate(as_completed(charts)):
+            symbol = charts[future]
+            try:
+                result = future.result()
+            except Exception as error:
+                result = {"files": [], "timings": {}, "error message": f"{type(error).__name__}: {error}"}
+            for stage, seconds in result.pop("timings").items():
+                timings[stage] += seconds
+                metrics.metrics.observe("export_stage_seconds", seconds, stage=stage)
+            result["charts"] = " ".join(result.pop("files"))
+            rows[symbol].update(result)
+            print(f"[{n + 1}/{len(charts)}] {symbol:<10} {result.get('error message') or result['charts']}",
+                  file=sys.stderr)
+        fetcher.shutdown()
+
+    with open(os.path.join(directory, "summary.csv"), "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for symbol in symbols:
+            writer.writerow(rows[symbol])
+    elapsed = time.perf_counter() - started
+    index = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "start": start,
+        "end": end,
+        "summary": "summary.csv",
+        "charts": {symbol: row["charts"].split() for symbol, row in rows.items() if row.get("charts")},
+        "errors": {symbol: row["error message"] for symbol, row in rows.items() if row.get("error message")},
+        "seconds": {"total": round(elapsed, 3), **{stage: round(timings[stage], 3) for stage in STAGES}},
+    }
+    with open(os.path.join(directory, "index.json"), "w") as file:
+        json.dump(index, file, indent=2)
+
+    print(f"Exported {len(index['charts'])} of {len(symbols)} symbols in {elapsed:.1f} s "
+          f"({len(index['errors'])} errors, see {os.path.join(directory, 'index.json')})", file=sys.stderr)
+    # fetch is summed over the fetching threads, compute, render and write over the worker processes
+    for stage in STAGES:
+        print(f"    {stage:<8} {timings[stage]:8.2f} s   {timings[stage] / max(len(symbols), 1) * 1e3:8.1f} ms/symbol",
+              file=sys.stderr)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export charts and a summary for a whole watchlist (no window)")
+    parser.add_argument("watchlist", help="file with comma separated ticker symbols (e.g. symbols_2.txt)")
+    parser.add_argument("directory", help="output directory (charts, summary.csv, index.json)")
+    parser.add_argument("--start", default=str(np.datetime64("today", "D") - 365), help="start date (YYYY-MM-DD)")
+    parser.add_argument("--end", default=str(np.datetime64("today", "D")), help="end date (YYYY-MM-DD)")
+    parser.add_argument("--formats", default="png", help="comma separated chart formats: png, svg, jpg")
+    parser.add_argument("--indicators", default="", help='comma separated indicators, e.g. "SMA 50,RSI 14"')
+    parser.add_argument("--width", type=int, default=1200, help="width of the charts in pixels")
+    parser.add_argument("--height", type=int, default=700, help="height of the charts in pixels")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: number of CPUs)")
+    parser.add_argument("--fetch", action="store_true", help="download the series which are not cached "
+                                                             "(default: only cached series, no API calls)")
+    parser.add_argument("--metrics", help="write the stage timings to this file (.json, or .prom)")
+    args = parser.parse_args(argv)
+    from batch import read_watchlist
+    formats = [extension.strip().lower() for extension in args.formats.split(",") if extension.strip()]
+    names = [name.strip() for name in args.indicators.split(",") if name.strip()]
+    unknown = [name for name in names if name not in INDICATORS.values()]
+    if unknown:
+        parser.error(f"unknown indicators {unknown}, choose from {list(INDICATORS.values())}")
+    try:
+        run_export(read_watchlist(args.watchlist), args.directory, args.start, args.end, formats, names,
+                   args.workers, args.fetch, args.width, args.height)
+    finally:
+        if args.metrics:
+            metrics.export(args.metrics)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import numpy as np
+
+# Indicators of an IndicatorSet: (kind, window) -> name of the curve(s)
+# "price" indicators share the scale of the price, the others are drawn in their own plot
+INDICATORS = {
+    ("sma", 50): "SMA 50",
+    ("sma", 200): "SMA 200",
+    ("ema", 20): "EMA 20",
+    ("bollinger", 20): "Bollinger 20",
+    ("rsi", 14): "RSI 14",
+    ("volatility", 20): "Volatility 20",
+    ("drawdown", None): "Drawdown",
+    ("returns", None): "Returns",
+}
+PRICE_INDICATORS = ("sma", "ema", "bollinger")
+TRADING_DAYS = 252  # Used to annualize the volatility
+
+
+def window_sums(x, window):
+    """Function returns the sum of every window of `window` values (cumulative sums, NaN for the first window-1)"""
+    sums = np.full(len(x), np.nan)
+    if len(x) >= window:
+        cumulative = np.concatenate([[0.0], np.cumsum(x)])
+        sums[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+
+def sma(x, window):
+    return window_sums(x, window) / window
+
+
+def rolling_std(x, window, ddof=0):
+    # Shifting by the first value keeps the cumulative sums of squares small (no cancellation for prices ~1000)
+    centered = x - x[0] if len(x) else x
+    mean = window_sums(centered, window) / window
+    variance = window_sums(centered ** 2, window) / window - mean ** 2
+    return np.sqrt(np.maximum(variance, 0) * window / (window - ddof))
+
+
+def smooth(x, alpha, initial=None):
+    """Function returns y[t] = (1 - alpha) * y[t-1] + alpha * x[t] (y[-1] = initial, default x[0])
+    without a loop over the values: within a block y is a scaled cumulative sum, only the blocks are looped
+    (a block is as long as the powers of (1 - alpha) stay far from underflow)"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.empty(len(x))
+    if not len(x):
+        return y
+    decay = 1 - alpha
+    block = len(x) if decay == 1 else max(1, int(200 / -np.log10(decay)))
+    previous = x[0] if initial is None else initial
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        powers = decay ** np.arange(len(chunk))     # decay^t
+        y[start:start + len(chunk)] = powers * (decay * previous + alpha * np.cumsum(chunk / powers))
+        previous = y[start + len(chunk) - 1]
+    return y
+
+
+def ema(x, window, initial=None):
+    return smooth(x, 2 / (window + 1), initial)
+
+
+def bollinger(x, window=20, width=2):
+    """Function returns the middle, upper and lower band"""
+    middle = sma(x, window)
+    deviation = rolling_std(x, window)
+    return middle, middle + width * deviation, middle - width * deviation
+
+
+def rsi_averages(close, window=14, initial=None):
+    """Function returns Wilder's average gain and loss of every bar, initial = (previous close, gain, loss)
+    continues a series, otherwise the averages start with the mean of the first window changes"""
+    if initial is None:
+        changes = np.diff(close)
+        gain = np.full(len(close), np.nan)
+        loss = np.full(len(close), np.nan)
+        if len(changes) >= window:
+            up, down = np.maximum(changes, 0), np.maximum(-changes, 0)
+            # The first average is the mean of the first window changes, then Wilder's smoothing
+            gain[window] = up[:window].mean()
+            loss[window] = down[:window].mean()
+            gain[window + 1:] = smooth(up[window:], 1 / window, gain[window])
+            loss[window + 1:] = smooth(down[window:], 1 / window, loss[window])
+        return gain, loss
+    previous_close, previous_gain, previous_loss = initial
+    changes = np.diff(np.concatenate([[previous_close], close]))
+    return (smooth(np.maximum(changes, 0), 1 / window, previous_gain),
+            smooth(np.maximum(-changes, 0), 1 / window, previous_loss))
+
+
+def rsi_from_averages(gain, loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+
+
+def volatility(close, window=20):
+    """Function returns the annualized volatility of the log returns over the last window days"""
+    result = np.full(len(close), np.nan)
+    result[1:] = rolling_std(np.diff(np.log(close)), window, ddof=1) * np.sqrt(TRADING_DAYS)
+    return result
+
+
+def drawdown(close, peak=None):
+    """Function returns the drop from the highest price so far (0 at a new high, -0.2 for 20 % below the high)"""
+    running_peak = np.maximum.accumulate(close if peak is None else np.concatenate([[peak], close]))
+    if peak is not None:
+        running_peak = running_peak[1:]
+    return close / running_peak - 1, running_peak
+
+
+def returns(close):
+    return np.concatenate([[np.nan], close[1:] / close[:-1] - 1])
+
+
+class IndicatorSet(object):
+    """Class holds all INDICATORS of one daily series. When the cache refresh appends bars only the new bars
+    are computed (windowed indicators from the last window of prices, smoothed ones from their last value)."""
+
+    def __init__(self, dates, close):
+        self.dates = dates
+        self.close = np.asarray(close, dtype=np.float64)
+        self.curves = {}    # name -> array with one value per bar
+        self._compute()
+
+    def _compute(self):
+        close = self.close
+        self.curves = {}
+        for (kind, window), name in INDICATORS.items():
+            if kind == "sma":
+                self.curves[name] = sma(close, window)
+            elif kind == "ema":
+                self.curves[name] = ema(close, window)
+            elif kind == "bollinger":
+                for band, values in zip(("middle", "upper", "lower"), bollinger(close, window)):
+                    self.curves[f"{name} {band}"] = values
+            elif kind == "rsi":
+                gain, loss = rsi_averages(close, window)
+                self.curves[f"_{name} gain"], self.curves[f"_{name} loss"] = gain, loss
+                self.curves[name] = rsi_from_averages(gain, loss)
+            elif kind == "volatility":
+                self.curves[name] = volatility(close, window)
+            elif kind == "drawdown":
+                self.curves[name], self.curves["_peak"] = drawdown(close)
+            elif kind == "returns":
+                self.curves[name] = returns(close)
+
+    def update(self, dates, close):
+        """Method brings the indicators up to date with the (refreshed) series"""
+        close = np.asarray(close, dtype=np.float64)
+        n = len(self.dates)
+        # Only the latest bar may have changed (unfinished day), otherwise (e.g. adjusted close after a dividend,
+        # or a series too short for the windows) everything is computed again
+        incremental = (n > 200 and len(dates) >= n and np.array_equal(dates[:n], self.dates)
+                       and np.array_equal(close[:n - 1], self.close[:n - 1]))
+        if not incremental:
+            self.dates, self.close = dates, close
+            self._compute()
+            return
+        if close[n - 1] != self.close[n - 1]:
+            self._truncate(n - 1)
+        self._extend(dates[len(self.dates):], close[len(self.close):])
+
+    def _truncate(self, length):
+        self.dates, self.close = self.dates[:length], self.close[:length]
+        self.curves = {name: values[:length] for name, values in self.curves.items()}
+
+    def _extend(self, dates, new):
+        if not len(new):
+            return
+        old = self.close
+        close = np.concatenate([old, new])
+        added = {}
+        for (kind, window), name in INDICATORS.items():
+            if kind in ("sma", "bollinger", "volatility"):
+                # The last window prices are all the windowed kernels need to continue
+                context = old[-(window + 1):]
+                part = np.concatenate([context, new])
+                if kind == "sma":
+                    added[name] = sma(part, window)[len(context):]
+                elif kind == "volatility":
+                    added[name] = volatility(part, window)[len(context):]
+                else:
+                    for band, values in zip(("middle", "upper", "lower"), bollinger(part, window)):
+                        added[f"{name} {band}"] = values[len(context):]
+            elif kind == "ema":
+                added[name] = ema(new, window, initial=self.curves[name][-1])
+            elif kind == "rsi":
+                gain, loss = rsi_averages(new, window, initial=(
+                    old[-1], self.curves[f"_{name} gain"][-1], self.curves[f"_{name} loss"][-1]))
+                added[f"_{name} gain"], added[f"_{name} loss"] = gain, loss
+                added[name] = rsi_from_averages(gain, loss)
+            elif kind == "drawdown":
+                added[name], added["_peak"] = drawdown(new, peak=self.curves["_peak"][-1])
+            elif kind == "returns":
+                added[name] = new / np.concatenate([old[-1:], new[:-1]]) - 1
+        self.curves = {name: np.concatenate([values, added[name]]) for name, values in self.curves.items()}
+        self.dates = np.concatenate([self.dates, dates])
+        self.close = close
+
+    def window(self, name, start, end):
+        """Method returns the values of a curve from start to end (both inclusive)"""
+        i = np.searchsorted(self.dates, np.datetime64(start, "D"), side="left")
+        j = np.searchsorted(self.dates, np.datetime64(end, "D"), side="right")
+        return self.curves[name][i:j]
@@ -0,0 +1,154 @@
+import json
+import bisect
+import threading
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram(object):
+    """Class counts observed values in fixed buckets (cumulative like Prometheus), plus their sum and count"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)     # Last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Method returns the upper bound of the bucket which contains the q quantile (None without values)"""
+        if not self.count:
+            return None
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= q * self.count:
+                return bound
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+
+class Metrics(object):
+    """Class collects counters and histograms by name and labels, e.g.
+        metrics.inc("alphavantage_requests_total", function="GLOBAL_QUOTE", outcome="ok")
+        metrics.observe("alphavantage_request_seconds", 0.21, function="GLOBAL_QUOTE")
+    collectors add values which are kept elsewhere (e.g. the scheduler counters) at the time of the export"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}      # (name, labels) -> value, labels as tuple of (label, value) pairs
+        self.histograms = {}    # (name, labels) -> Histogram
+        self.help = {}          # name -> description
+        self.collectors = []    # Functions returning a list of (name, labels dict, value)
+
+    @staticmethod
+    def _labels(labels):
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, self._labels(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, self._labels(labels))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    def register(self, collector):
+        self.collectors.append(collector)
+
+    def _collected(self):
+        samples = {}
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                samples[(name, self._labels(labels))] = value
+        return samples
+
+    def snapshot(self):
+        """Method returns all values as a json-serializable dictionary: name -> list of {labels, value}"""
+        result = {}
+        counters = self._collected()
+        with self.lock:
+            counters.update(self.counters)
+            histograms = {key: histogram.snapshot() for key, histogram in self.histograms.items()}
+        for (name, labels), value in sorted(counters.items()):
+            result.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), value in sorted(histograms.items()):
+            result.setdefault(name, []).append({"labels": dict(labels), **value})
+        return result
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Method returns all values in the Prometheus text format"""
+        lines = []
+        counters = self._collected()
+        with self.lock:
+            counters.update(self.counters)
+            histograms = {key: (histogram.buckets, list(histogram.counts), histogram.sum, histogram.count)
+                          for key, histogram in self.histograms.items()}
+        described = set()
+
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter" if name.endswith("_total") else "gauge")
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+
+
+def format_labels(labels):
+    """Function returns the labels in the Prometheus notation: {function="GLOBAL_QUOTE",outcome="ok"}"""
+    if not labels:
+        return ""
+    escape = lambda value: value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+def export(path, registry=None):
+    """Function writes the metrics to a file, Prometheus text for .prom and .txt files, json otherwise"""
+    registry = registry or metrics
+    with open(path, "w") as file:
+        file.write(registry.to_prometheus() if path.endswith((".prom", ".txt")) else registry.to_json())
+
+
+# One registry for the whole application
+metrics = Metrics()
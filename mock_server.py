@@ -0,0 +1,220 @@
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import requests
+from symbols import SymbolIndex
+
+# Local stand-in for the AlphaVantage API, start it with "python mock_server.py" and point the application to it
+# with ALPHAVANTAGE_URL=http://127.0.0.1:8765/query (no API calls are spent, the keys are not checked)
+
+ALPHAVANTAGE_URL = "https://www.alphavantage.co/query"
+# Same payloads AlphaVantage sends for an exceeded limit and an unknown symbol
+NOTE = {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute "
+                "and 500 calls per day."}
+ERROR = {"Error Message": "Invalid API call. Please retry or visit the documentation for the function."}
+CURRENCIES = {"United States": "USD", "Germany": "EUR", "United Kingdom": "GBX", "Switzerland": "CHF",
+              "France": "EUR", "Italy": "EUR"}
+USD_RATES = {"USD": 1.0, "EUR": 1.1, "GBP": 1.3, "CHF": 1.1, "JPY": 0.007}    # Level of the synthetic FX rates
+
+
+def make_time_series(bars, step_days=1, end=date(2020, 12, 31), seed=0):
+    """Function returns a time series dict like AlphaVantage does (newest date first, all values as strings)"""
+    rng = random.Random(seed)
+    time_series = {}
+    day = end
+    price = 100.0
+    while len(time_series) < bars:
+        if day.weekday() < 5:   # Only trading days (weekly series end on a weekday as well)
+            price *= 1 + rng.uniform(-0.02, 0.02)
+            time_series[day.isoformat()] = {
+                "1. open": f"{price:.4f}",
+                "2. high": f"{price * 1.01:.4f}",
+                "3. low": f"{price * 0.99:.4f}",
+                "4. close": f"{price:.4f}",
+                "5. adjusted close": f"{price:.4f}",
+                "6. volume": str(rng.randint(10 ** 5, 10 ** 7)),
+                "7. dividend amount": "0.0000",
+                "8. split coefficient": "1.0",
+            }
+        day -= timedelta(days=step_days)
+    return time_series
+
+
+def fixture_name(params):
+    """Function returns the file name of the stored answer to a call, e.g. GLOBAL_QUOTE_AAPL.json"""
+    name = "_".join(params.get(key, "") for key in ("function", "symbol", "from_symbol", "to_symbol", "keywords",
+                                                    "outputsize") if params.get(key))
+    return re.sub(r"[^A-Za-z0-9._\-]", "_", name.upper()) + ".json"
+
+
+class MockServer(ThreadingHTTPServer):
+    """HTTP server which answers like AlphaVantage: stored answers (fixtures) first, otherwise synthetic data
+    (the same symbol always gets the same prices), with injectable latency, "Note" and "Error Message" answers"""
+    daemon_threads = True
+
+    def __init__(self, address, fixtures="fixtures", latency=0.0, jitter=0.0, note_rate=0.0, error_rate=0.0,
+                 per_minute=0, record=False, seed=0):
+        super().__init__(address, MockHandler)
+        self.fixtures = fixtures
+        self.latency = latency          # Seconds added to every answer
+        self.jitter = jitter            # + uniform random seconds up to jitter
+        self.note_rate = note_rate      # Share of the calls answered with a "Note"
+        self.error_rate = error_rate    # Share of the calls answered with an "Error Message"
+        self.per_minute = per_minute    # Calls per minute and key before the "Note" (0 -> no limit)
+        self.record = record            # Unknown calls are passed on to AlphaVantage and saved as fixture
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {}                 # apikey -> times of its calls within the last minute
+        self.symbol_index = SymbolIndex(
+            "symbols_2.txt", os.path.join(os.environ.get("STOCK_CACHE_DIR", "cache"), "mock_symbols.pickle"))
+
+    def _throttled(self, apikey):
+        with self.lock:
+            if self.rng.random() < self.note_rate:
+                return True
+            if not self.per_minute:
+                return False
+            now = time.monotonic()
+            calls = [call for call in self.calls.get(apikey, []) if now - call < 60]
+            self.calls[apikey] = calls
+            if len(calls) >= self.per_minute:
+                return True
+            calls.append(now)
+            return False
+
+    def answer(self, params):
+        """Method returns the json payload for the query parameters of a call"""
+        delay = self.latency
+        if self.jitter:
+            with self.lock:
+                delay += self.rng.uniform(0, self.jitter)
+        time.sleep(delay)
+        if self._throttled(params.get("apikey", "")):
+            return NOTE
+        with self.lock:
+            if self.rng.random() < self.error_rate:
+                return ERROR
+        path = os.path.join(self.fixtures, fixture_name(params))
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                return json.load(file)
+        if self.record:
+            data = requests.get(ALPHAVANTAGE_URL, params=params, timeout=30).json()
+            if "Note" not in data:  # An exceeded limit is no answer worth replaying
+                os.makedirs(self.fixtures, exist_ok=True)
+                with open(path, "w") as file:
+                    json.dump(data, file)
+            return data
+        return self.synthetic(params)
+
+    def synthetic(self, params):
+        function = params.get("function", "")
+        symbol = params.get("symbol", "").upper()
+        if function == "SYMBOL_SEARCH":
+            matches = []
+            for score, name, region, kind, match in self.symbol_index.search(params.get("keywords", ""), limit=10):
+                matches.append({
+                    "1. symbol": match, "2. name": name or f"{match} Corporation", "3. type": kind,
+                    "4. region": region, "5. marketOpen": "09:30", "6. marketClose": "16:00",
+                    "7. timezone": "UTC-04", "8. currency": CURRENCIES.get(region, "USD"), "9. matchScore": score,
+                })
+            return {"bestMatches": matches}
+        if function == "FX_DAILY":
+            pair = (params.get("from_symbol", "").upper(), params.get("to_symbol", "").upper())
+            if not all(currency in USD_RATES for currency in pair):
+                return ERROR
+            # Random walk around 100 scaled to the level of the pair (only open, high, low and close like FX_DAILY)
+            level = USD_RATES[pair[0]] / USD_RATES[pair[1]] / 100
+            bars = 100 if params.get("outputsize", "compact") == "compact" else 5000
+            time_series = {}
+            for day, bar in make_time_series(bars, end=date.today(), seed=zlib.crc32("".join(pair).encode())).items():
+                time_series[day] = {key: f"{float(bar[key]) * level:.5f}"
+                                    for key in ("1. open", "2. high", "3. low", "4. close")}
+            return {"Meta Data": {"2. From Symbol": pair[0], "3. To Symbol": pair[1]},
+                    "Time Series FX (Daily)": time_series}
+        # Unknown symbols fail like they do at AlphaVantage
+        if symbol not in self.symbol_index:
+            return ERROR
+        seed = zlib.crc32(symbol.encode())
+        if function == "TIME_SERIES_DAILY_ADJUSTED":
+            bars = 100 if params.get("outputsize", "compact") == "compact" else 5200
+            return {"Meta Data": {"2. Symbol": symbol},
+                    "Time Series (Daily)": make_time_series(bars, end=date.today(), seed=seed)}
+        if function == "TIME_SERIES_WEEKLY_ADJUSTED":
+            # Weekly dates are Fridays (7 day steps from a Saturday or Sunday would never hit a trading day)
+            friday = date.today() - timedelta(days=(date.today().weekday() - 4) % 7)
+            return {"Meta Data": {"2. Symbol": symbol},
+                    "Weekly Adjusted Time Series": make_time_series(1100, step_days=7, end=friday, seed=seed)}
+        if function == "GLOBAL_QUOTE":
+            (day, latest), (_, previous) = list(make_time_series(2, end=date.today(), seed=seed).items())
+            price, previous_close = float(latest["4. close"]), float(previous["4. close"])
+            return {"Global Quote": {
+                "01. symbol": symbol, "02. open": latest["1. open"], "03. high": latest["2. high"],
+                "04. low": latest["3. low"], "05. price": latest["4. close"], "06. volume": latest["6. volume"],
+                "07. latest trading day": day, "08. previous close": previous["4. close"],
+                "09. change": f"{price - previous_close:.4f}",
+                "10. change percent": f"{(price - previous_close) / previous_close * 100:.4f}%",
+            }}
+        return ERROR
+
+
+class MockHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/query":
+            self.send_error(404)
+            return
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = json.dumps(self.server.answer(params)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if os.environ.get("STOCK_LOG_LEVEL", "WARNING") == "DEBUG":
+            super().log_message(format, *args)
+
+
+def start_server(port=0, **options):
+    """Function starts a MockServer on a background thread and returns (server, url), port 0 -> any free port"""
+    server = MockServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/query"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the AlphaVantage API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default="fixtures", help="directory of the stored answers (--record saves there)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra seconds (uniform, up to)")
+    parser.add_argument("--note-rate", type=float, default=0.0, help="share of calls answered with a Note")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with an Error Message")
+    parser.add_argument("--per-minute", type=int, default=0, help="calls per minute and key before a Note (0: no limit)")
+    parser.add_argument("--record", action="store_true",
+                        help="pass calls without fixture on to AlphaVantage and save the answers")
+    args = parser.parse_args(argv)
+    server = MockServer(("127.0.0.1", args.port), args.fixtures, args.latency, args.jitter, args.note_rate,
+                        args.error_rate, args.per_minute, args.record)
+    print(f"Serving on http://127.0.0.1:{args.port}/query (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import sys
+import csv
+import argparse
+import numpy as np
+import alphavantage
+from compare import align
+
+# Currency of a listing by the suffix of its symbol (if the symbol index does not know it), see REGIONS
+SUFFIX_CURRENCIES = {"": "USD", ".DE": "EUR", ".LON": "GBX", ".SWI": "CHF", ".PA": "EUR", ".MIL": "EUR"}
+# Currencies quoted in a fraction of another one (London prices are in pence)
+SUBUNITS = {"GBX": ("GBP", 0.01), "GBP": ("GBP", 1.0)}
+
+
+def currency_code(text):
+    """Function returns the upper case currency code, pence written as GBp are GBX (not GBP)"""
+    return "GBX" if text.strip() in ("GBp", "GBx") else text.strip().upper()
+
+
+def read_holdings(path):
+    """Function returns the positions of a holdings file as list of (symbol, quantity, currency or None),
+    one position per line: symbol, quantity[, currency] (lines starting with # and a header line are skipped)"""
+    holdings = []
+    with open(path, "r") as file:
+        for row in csv.reader(file, delimiter=","):
+            row = [field.strip() for field in row]
+            if not row or not row[0] or row[0].startswith("#"):
+                continue
+            try:
+                quantity = float(row[1])
+            except (IndexError, ValueError):    # Header or a line without quantity
+                continue
+            currency = currency_code(row[2]) if len(row) > 2 and row[2] else None
+            holdings.append((row[0].upper(), quantity, currency))
+    return holdings
+
+
+def listing_currency(symbol, symbol_index=None):
+    """Function returns the currency of a symbol (from the symbol index, otherwise by its suffix)"""
+    info = symbol_index.info(symbol) if symbol_index is not None else None
+    if info and info.get("currency"):
+        return currency_code(info["currency"])
+    suffix = symbol[symbol.rfind("."):].upper() if "." in symbol else ""
+    return SUFFIX_CURRENCIES.get(suffix, "USD")     # e.g. BRK.B is a US listing
+
+
+class Portfolio(object):
+    """Class values a set of positions in one base currency: all price series and one FX series per currency
+    are loaded once, then the whole history is valued with array operations
+    (prices matrix x exchange rate matrix x quantities, dates aligned like the comparison)"""
+
+    def __init__(self, holdings, base="USD", symbol_index=None):
+        self.base = base.upper()
+        self.symbols = [symbol for symbol, quantity, currency in holdings]
+        self.quantities = np.array([quantity for symbol, quantity, currency in holdings], dtype=np.float64)
+        self.currencies = [currency or listing_currency(symbol, symbol_index) for symbol, quantity, currency in holdings]
+        self.series = {}    # symbol -> daily PriceSeries
+        self.fx = {}        # currency -> FX PriceSeries (base per unit of the currency)
+        self.errors = {}    # symbol or currency pair -> error message
+
+    @classmethod
+    def from_file(cls, path, base="USD", symbol_index=None):
+        return cls(read_holdings(path), base, symbol_index)
+
+    def _pair(self, currency):
+        """Method returns (currency of the FX series, factor) of a listing currency, e.g. GBX -> (GBP, 0.01)"""
+        return SUBUNITS.get(currency, (currency, 1.0))
+
+    def load(self, load_series):
+        """Method loads all price series and the FX series of every foreign currency (all at the same time),
+        load_series(symbol, interval) -> (series, error message), e.g. stockdata.load_series"""
+        calls = {(symbol, "daily") for symbol in self.symbols}
+        for currency in set(self.currencies):
+            fx_currency = self._pair(currency)[0]
+            if fx_currency != self.base:
+                calls.add((fx_currency + self.base, "fx"))
+        futures = {call: alphavantage.executor.submit(load_series, *call) for call in calls}
+        for (symbol, interval), future in futures.items():
+            series, error = future.result()
+            if series is None:
+                self.errors[symbol] = error
+            elif interval == "fx":
+                self.fx[symbol[:3]] = series
+            else:
+                self.series[symbol] = series
+        return self.errors
+
+    def value(self, start=None, end=None):
+        """Method returns (dates, symbols, values) with the value of every position in the base currency per day
+        (values: one column per position which could be valued, NaN before the history of a position starts)"""
+        start = start or "1900-01-01"
+        end = end or str(np.datetime64("today", "D"))
+        positions = [j for j, symbol in enumerate(self.symbols)
+                     if symbol in self.series and self._rate_known(self.currencies[j])]
+        fx_currencies = sorted(self.fx)
+        windows = [self.series[self.symbols[j]].slice(start, end) for j in positions]
+        # FX series begin a bit earlier, so the rate of the first trading day is known even after an FX holiday
+        fx_windows = [self.fx[currency].slice(np.datetime64(start, "D") - 10, end) for currency in fx_currencies]
+        if not windows or not any(len(window) for window in windows):
+            return np.array([], dtype="datetime64[D]"), [], np.empty((0, 0))
+        dates, prices = align(windows, "adjusted_close")
+        if fx_windows:
+            fx_dates, rates = align(fx_windows, "close")
+            # Rate of the latest FX date up to every price date (forward fill across the FX holidays)
+            rows = np.searchsorted(fx_dates, dates, side="right") - 1
+            rates = np.where(rows[:, None] >= 0, rates[np.maximum(rows, 0)], np.nan)
+        else:
+            rates = np.empty((len(dates), 0))
+        # Column of the rates per position: the base currency is a column of ones
+        rates = np.concatenate([rates, np.ones((len(dates), 1))], axis=1)
+        columns = np.array([fx_currencies.index(self._pair(self.currencies[j])[0])
+                            if self._pair(self.currencies[j])[0] != self.base else len(fx_currencies)
+                            for j in positions])
+        factors = np.array([self._pair(self.currencies[j])[1] for j in positions])
+        values = prices * rates[:, columns] * (factors * self.quantities[positions])
+        return dates, [self.symbols[j] for j in positions], values
+
+    def _rate_known(self, currency):
+        fx_currency = self._pair(currency)[0]
+        return fx_currency == self.base or fx_currency in self.fx
+
+    def equity_curve(self, start=None, end=None):
+        """Method returns (dates, total value) from the first day on which every position has a price"""
+        dates, symbols, values = self.value(start, end)
+        if not len(dates):
+            return dates, np.array([])
+        complete = ~np.isnan(values).any(axis=1)
+        first = np.argmax(complete) if complete.any() else 0
+        return dates[first:], np.nansum(values[first:], axis=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Value a portfolio (holdings file: symbol, quantity[, currency])")
+    parser.add_argument("holdings", help="file with one position per line, e.g. BAYN.DE, 100")
+    parser.add_argument("--base", default="USD", help="currency of the valuation (default USD)")
+    parser.add_argument("--start", default=None, help="start date of the equity curve (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="end date (YYYY-MM-DD)")
+    parser.add_argument("--curve", help="write the daily total value to this csv file")
+    args = parser.parse_args(argv)
+    from stockdata import load_series, symbol_index
+    portfolio = Portfolio.from_file(args.holdings, args.base, symbol_index)
+    for symbol, error in portfolio.load(load_series).items():
+        print(f"{symbol}: {error}", file=sys.stderr)
+    dates, symbols, values = portfolio.value(args.start, args.end)
+    if not len(dates):
+        print("No prices in the given time frame", file=sys.stderr)
+        return 1
+    latest = np.nan_to_num(values[-1])
+    for j, symbol in enumerate(symbols):
+        print(f"{symbol:<12} {latest[j]:16,.2f} {portfolio.base}")
+    print(f"{'Total':<12} {latest.sum():16,.2f} {portfolio.base}   ({dates[-1]})")
+    if args.curve:
+        curve_dates, total = portfolio.equity_curve(args.start, args.end)
+        with open(args.curve, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["date", f"value_{portfolio.base}"])
+            writer.writerows(zip(curve_dates.astype(str), np.round(total, 2)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
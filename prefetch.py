@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import logging
+import threading
+import alphavantage
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher(object):
+    """Class downloads daily series in the background while the user is idle and the key has calls to spare:
+        1. refreshes the stale series of the symbols the user looked at, most used (and recently used) first
+        2. backfills the symbols of the ticker list which are not cached yet, one after the other
+    Usage and position in the ticker list are kept in a json file, so a restart continues where it stopped."""
+
+    def __init__(self, load, cache, tickers, apikey, path=os.path.join("cache", "prefetch.json"), idle_seconds=30,
+                 reserve_per_minute=2, reserve_per_day=100, half_life_days=7, retry_after=24 * 60 * 60):
+        self.load = load                # symbol -> (series, error message), with priority=BACKGROUND
+        self.cache = cache              # SeriesCache of the series
+        self.tickers = tickers          # Function returning the ticker list (symbols_2.txt)
+        self.apikey = apikey
+        self.path = path
+        self.idle_seconds = idle_seconds                # No prefetching until the last click is this long ago
+        self.reserve_per_minute = reserve_per_minute    # Calls which are always left for the buttons
+        self.reserve_per_day = reserve_per_day
+        self.half_life_days = half_life_days            # A use a week ago counts half as much as one today
+        self.retry_after = retry_after                  # Seconds until a failed symbol is tried again
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.last_activity = time.monotonic()
+        self.usage = {}     # symbol -> [number of uses, time of the last use]
+        self.cursor = 0     # Position of the backfill in the ticker list
+        self.failed = {}    # symbol -> time of the last failed download
+        self.fetched = 0    # Series downloaded since the start
+        try:
+            with open(path, "r") as file:
+                state = json.load(file)
+            self.usage, self.cursor, self.failed = state["usage"], state["cursor"], state["failed"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as file:
+                json.dump({"usage": self.usage, "cursor": self.cursor, "failed": self.failed}, file)
+        except OSError:
+            pass
+
+    def record(self, symbol):
+        """Method is called for every symbol the user asks for (and postpones the prefetching)"""
+        symbol = symbol.strip().upper()
+        with self.lock:
+            self.last_activity = time.monotonic()
+            if symbol:
+                count, last = self.usage.get(symbol, [0, 0.0])
+                self.usage[symbol] = [count + 1, time.time()]
+                self._save()
+
+    def score(self, symbol):
+        count, last = self.usage[symbol]
+        return count * 0.5 ** ((time.time() - last) / (self.half_life_days * 24 * 60 * 60))
+
+    def next_symbol(self):
+        """Method returns the next symbol to download (None if there is nothing to do) and moves the cursor"""
+        now = time.time()
+        with self.lock:
+            failed = {symbol for symbol, when in self.failed.items() if now - when < self.retry_after}
+            for symbol in sorted(self.usage, key=self.score, reverse=True):
+                if symbol not in failed and self.cache.is_stale(symbol, "daily"):
+                    return symbol
+            tickers = self.tickers()
+            for i in range(len(tickers)):
+                symbol = tickers[(self.cursor + i) % len(tickers)].upper()
+                if symbol not in failed and not self.cache.contains(symbol, "daily"):
+                    self.cursor = (self.cursor + i + 1) % len(tickers)
+                    return symbol
+            return None
+
+    def idle(self):
+        """Method returns True if the user is idle, no button call is waiting and the key has calls to spare"""
+        return (time.monotonic() - self.last_activity >= self.idle_seconds
+                and alphavantage.scheduler.waiting_count() == 0
+                and alphavantage.scheduler.spare(self.apikey, self.reserve_per_minute, self.reserve_per_day))
+
+    def step(self):
+        """Method downloads one series if the time is right, returns the symbol (or None)"""
+        if not self.idle():
+            return None
+        symbol = self.next_symbol()
+        if symbol is None:
+            return None
+        series, error = self.load(symbol)
+        with self.lock:
+            if series is None:
+                self.failed[symbol] = time.time()
+                logger.info("Prefetching %s failed: %s", symbol, error)
+            else:
+                self.failed.pop(symbol, None)
+                self.fetched += 1
+                logger.debug("Prefetched %s", symbol)
+            self._save()
+        return symbol
+
+    def run(self, poll=1.0):
+        while not self.stopped.wait(poll):
+            try:
+                self.step()
+            except Exception:   # e.g. offline, the next round tries again
+                logger.exception("Prefetching failed")
+                self.stopped.wait(60)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="prefetch", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,190 @@
+import time
+import itertools
+import threading
+from collections import deque
+from datetime import date
+
+# Priority lanes of the scheduler (lower number goes first)
+INTERACTIVE = 0     # Button presses in the GUI
+BACKGROUND = 1      # Prefetching, batch jobs etc.
+
+
+class TokenBucket(object):
+    """Class allows per_minute calls per minute (refilled continuously) and per_day calls per day"""
+
+    def __init__(self, per_minute=5, per_day=500):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0    # Set after AlphaVantage answered with a "Note"
+        self.day = date.today()
+        self.used_today = 0
+        self.recent = deque()       # Times of the calls within the last minute
+
+    def _refill(self, now):
+        self.tokens = min(self.per_minute, self.tokens + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+        if date.today() != self.day:    # New day -> new daily budget
+            self.day = date.today()
+            self.used_today = 0
+
+    def wait_time(self):
+        """Method returns the seconds until the next call is allowed (0 -> now, None -> daily budget used up)"""
+        now = time.monotonic()
+        self._refill(now)
+        if self.used_today >= self.per_day:
+            return None
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) * 60 / self.per_minute
+
+    def take(self):
+        self.tokens -= 1
+        self.used_today += 1
+        self.recent.append(time.monotonic())
+
+    def remaining(self):
+        """Method returns (whole calls left this minute, calls left today), the key with the most is used first"""
+        return int(self.tokens), self.per_day - self.used_today
+
+    def calls_last_minute(self):
+        now = time.monotonic()
+        while self.recent and now - self.recent[0] > 60:
+            self.recent.popleft()
+        return len(self.recent)
+
+    def block(self, seconds=60):
+        """Method empties the bucket for the given time (AlphaVantage counts per minute on its side)"""
+        self.tokens = 0.0
+        self.blocked_until = time.monotonic() + seconds
+
+
+class KeyPool(object):
+    """Class holds several AlphaVantage keys which share the calls: a call passed a pool instead of a key
+    goes to the key with the most budget left and fails over to another key if AlphaVantage throttles it"""
+
+    def __init__(self, keys):
+        # Each key only once (the same key may be in two variables), a pool without any key is a pool of None
+        self.keys = [key for key in dict.fromkeys(keys) if key] or [None]
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def keys_of(apikey):
+    """Function returns the list of keys of a single key or a KeyPool"""
+    return list(apikey) if isinstance(apikey, KeyPool) else [apikey]
+
+
+class Scheduler(object):
+    """Class hands out the AlphaVantage calls of every key in order of priority (first come first served
+    within a lane), each caller waits until the token bucket of its key (or of one key of its pool) allows the call"""
+
+    def __init__(self, per_minute=5, per_day=500):
+        self.per_minute = per_minute    # Budget for keys which were not configured
+        self.per_day = per_day
+        self.buckets = {}   # key -> TokenBucket
+        self.labels = {}    # key -> name shown in the statistics (the keys themselves are never shown)
+        self.counters = {}  # label -> {"queued", "throttled", "served"}
+        self.waiting = []   # (priority, number, keys) of the callers waiting for a token
+        self.numbers = itertools.count()
+        self.condition = threading.Condition()
+
+    def configure(self, apikey, label, per_minute=None, per_day=None):
+        with self.condition:
+            self.buckets[apikey] = TokenBucket(per_minute or self.per_minute, per_day or self.per_day)
+            label = self.labels.setdefault(apikey, label)   # Keys used twice (e.g. same key in both variables)
+            self.counters.setdefault(label, {"queued": 0, "throttled": 0, "served": 0})
+
+    def _bucket(self, apikey):
+        if apikey not in self.buckets:
+            self.configure(apikey, f"key {len(self.buckets) + 1}")
+        return self.buckets[apikey]
+
+    def label(self, apikey):
+        with self.condition:
+            self._bucket(apikey)
+            return self.labels[apikey]
+
+    def _count(self, apikey, counter):
+        self.counters[self.labels[apikey]][counter] += 1
+
+    def acquire(self, apikey, priority=INTERACTIVE):
+        """Method blocks until a call with apikey is allowed, returns False if the daily budget is used up"""
+        return self.acquire_any([apikey], priority)[0]
+
+    def acquire_any(self, keys, priority=INTERACTIVE):
+        """Method blocks until a call with one of the keys is allowed, returns (True, key with the most budget left)
+        or (False, None) if the daily budget of every key is used up (a key itself may be None if it is not set)"""
+        with self.condition:
+            buckets = {apikey: self._bucket(apikey) for apikey in keys}
+            entry = (priority, next(self.numbers), tuple(keys))
+            self.waiting.append(entry)
+            queued = False
+            try:
+                while True:
+                    waits = {apikey: bucket.wait_time() for apikey, bucket in buckets.items()}
+                    if all(wait is None for wait in waits.values()):
+                        for apikey in keys:    # Every key of the pool was out of budget for this call
+                            self._count(apikey, "throttled")
+                        return False, None
+                    # Only the first waiting caller of a key may take its token
+                    first = [apikey for apikey in keys
+                             if entry == min(waiter for waiter in self.waiting if apikey in waiter[2])]
+                    ready = [apikey for apikey in first if waits[apikey] == 0]
+                    if ready:
+                        apikey = max(ready, key=lambda ready_key: buckets[ready_key].remaining())
+                        buckets[apikey].take()
+                        self._count(apikey, "served")
+                        if queued:     # Every caller which had to wait is counted once (for the key it got)
+                            self._count(apikey, "queued")
+                        return True, apikey
+                    queued = True
+                    # Woken up once a token is due or the callers in front of us are done
+                    self.condition.wait(min((waits[apikey] for apikey in first if waits[apikey] is not None),
+                                            default=None))
+            finally:
+                self.waiting.remove(entry)
+                self.condition.notify_all()
+
+    def throttled(self, apikey, seconds=60):
+        """Method is called when AlphaVantage answered with a "Note" (call frequency exceeded)"""
+        with self.condition:
+            self._bucket(apikey).block(seconds)
+            self._count(apikey, "throttled")
+
+    def spare(self, apikey, reserve_per_minute=0, reserve_per_day=0):
+        """Method returns True if a call with apikey (with one key of a KeyPool) is allowed right now
+        and still leaves the reserved calls"""
+        with self.condition:
+            for bucket in map(self._bucket, keys_of(apikey)):
+                if (bucket.wait_time() == 0 and bucket.tokens >= 1 + reserve_per_minute
+                        and bucket.per_day - bucket.used_today > reserve_per_day):
+                    return True
+            return False
+
+    def waiting_count(self, priority=None):
+        with self.condition:
+            return sum(1 for waiter in self.waiting if priority is None or waiter[0] == priority)
+
+    def stats(self):
+        """Method returns the queued, throttled and served counters per key"""
+        with self.condition:
+            return {label: dict(counters) for label, counters in self.counters.items()}
+
+    def budget(self):
+        """Method returns calls used today and within the last minute and the daily and per-minute budget per key"""
+        with self.condition:
+            budget = {}
+            for apikey, bucket in self.buckets.items():
+                bucket.wait_time()  # Starts the new day if necessary
+                budget[self.labels[apikey]] = {"used today": bucket.used_today, "per day": bucket.per_day,
+                                               "last minute": bucket.calls_last_minute(),
+                                               "per minute": bucket.per_minute}
+            return budget
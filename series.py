@@ -0,0 +1,77 @@
+import numpy as np
+
+# AlphaVantage json keys of the price columns -> column names of the PriceSeries
+COLUMNS = {
+    "1. open": "open",
+    "2. high": "high",
+    "3. low": "low",
+    "4. close": "close",
+    "5. adjusted close": "adjusted_close",
+    "6. volume": "volume",
+}
+
+
+class PriceSeries(object):
+    """Class holds a time series as columns of NumPy arrays sorted by date
+    (dates as datetime64[D], prices and volume as float64)"""
+
+    def __init__(self, dates, columns):
+        self.dates = dates
+        self.columns = columns
+
+    @classmethod
+    def from_json(cls, time_series):
+        """Method converts the decoded time series of an AlphaVantage response (dict date -> dict of strings)"""
+        dates = np.array(list(time_series), dtype="datetime64[D]")
+        bars = list(time_series.values())
+        columns = {}
+        if bars:
+            for key, name in COLUMNS.items():
+                if key in bars[0]:
+                    # numpy converts the whole column of strings at once
+                    columns[name] = np.array([bar[key] for bar in bars]).astype(np.float64)
+        order = np.argsort(dates, kind="stable")    # AlphaVantage returns the newest date first
+        return cls(dates[order], {name: column[order] for name, column in columns.items()})
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def slice(self, start, end):
+        """Method returns the part of the series from start to end (both inclusive) without copying
+        (two binary searches on the dates in the series, so holidays and weekly dates need no special handling)"""
+        i = np.searchsorted(self.dates, np.datetime64(start, "D"), side="left")
+        j = np.searchsorted(self.dates, np.datetime64(end, "D"), side="right")
+        return PriceSeries(self.dates[i:j], {name: column[i:j] for name, column in self.columns.items()})
+
+    def merge(self, newer):
+        """Method returns a new series with the values of newer replacing the values of the same dates"""
+        dates = np.concatenate([newer.dates, self.dates])
+        # np.unique returns the index of the first occurrence -> values of newer win
+        dates, index = np.unique(dates, return_index=True)
+        columns = {}
+        for name in self.columns:
+            if name in newer.columns:
+                columns[name] = np.concatenate([newer.columns[name], self.columns[name]])[index]
+        return PriceSeries(dates, columns)
+
+    def continues(self, newer):
+        """Method returns whether newer has the same adjusted prices on the dates both series have (except the
+        latest date of this series, which may have been an unfinished day). AlphaVantage recomputes the whole
+        adjusted history after a dividend or a split, a series downloaded before must then not be merged"""
+        name = "adjusted_close" if "adjusted_close" in self.columns else "close"   # FX series are never adjusted
+        if name not in newer.columns:
+            return False
+        dates, mine, theirs = np.intersect1d(self.dates[:-1], newer.dates, return_indices=True)
+        # AlphaVantage rounds to 4 decimals, a recomputed history differs by more than that
+        return len(dates) > 0 and bool(np.allclose(self[name][mine], newer[name][theirs], rtol=1e-6, atol=1e-4))
+
+    def save(self, file):
+        np.savez(file, dates=self.dates, **self.columns)
+
+    @classmethod
+    def load(cls, file):
+        with np.load(file) as data:
+            return cls(data["dates"], {name: data[name] for name in data.files if name != "dates"})
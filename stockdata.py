@@ -0,0 +1,276 @@
+import os
+import re
+import logging
+from dotenv import load_dotenv, find_dotenv
+import alphavantage
+import numpy as np
+from cache import SeriesCache, TTLCache
+from symbols import SymbolIndex
+from watch import WatchList
+from ratelimit import INTERACTIVE, BACKGROUND, KeyPool
+from prefetch import Prefetcher
+from metrics import metrics
+
+# Data layer of the application (AlphaVantage calls, caches, symbol index) without any Qt,
+# so scripts and the batch mode can use it without loading the GUI: from stockdata import get_infos
+
+logger = logging.getLogger(__name__)
+
+# Find and insert the API KEY ("hiding the API KEY"), 2 different keys for main window and search engine
+load_dotenv(find_dotenv())
+API_KEY = os.environ.get('OPX_KEY')
+IPA_KEY = os.environ.get('QTW_KEY')
+
+# Budget of each key (free tier by default), all calls wait in the scheduler until their key has budget left
+alphavantage.scheduler.configure(API_KEY, "API_KEY",
+                                 per_minute=int(os.environ.get('OPX_CALLS_PER_MINUTE', '5')),
+                                 per_day=int(os.environ.get('OPX_CALLS_PER_DAY', '500')))
+alphavantage.scheduler.configure(IPA_KEY, "IPA_KEY",
+                                 per_minute=int(os.environ.get('QTW_CALLS_PER_MINUTE', '5')),
+                                 per_day=int(os.environ.get('QTW_CALLS_PER_DAY', '500')))
+# Any number of further keys (comma separated), all with the same budget
+EXTRA_KEYS = [key.strip() for key in os.environ.get('ALPHAVANTAGE_KEYS', '').split(',') if key.strip()]
+for n, key in enumerate(EXTRA_KEYS):
+    alphavantage.scheduler.configure(key, f"KEY_{n + 3}",
+                                     per_minute=int(os.environ.get('ALPHAVANTAGE_KEYS_CALLS_PER_MINUTE', '5')),
+                                     per_day=int(os.environ.get('ALPHAVANTAGE_KEYS_CALLS_PER_DAY', '500')))
+
+# All keys share all calls: each call goes to the key with the most budget left (another one after a "Note"),
+# so the calls per minute grow with the number of keys
+KEYS = KeyPool([API_KEY, IPA_KEY] + EXTRA_KEYS)
+
+# Local cache for the downloaded time series (directory, size cap in MB and max age in seconds can be set in the env.)
+series_cache = SeriesCache(
+    directory=os.environ.get('STOCK_CACHE_DIR', 'cache'),
+    max_bytes=int(os.environ.get('STOCK_CACHE_MAX_MB', '200')) * 1024 * 1024,
+    max_age=int(os.environ.get('STOCK_CACHE_MAX_AGE', '21600'))
+)
+
+# Symbol search results and metadata (name, currency, region) hardly ever change, failed searches are kept for a day
+search_cache = TTLCache(
+    os.path.join(os.environ.get('STOCK_CACHE_DIR', 'cache'), "search.json"),
+    ttl=int(os.environ.get('STOCK_SEARCH_TTL', str(30 * 24 * 60 * 60))),
+    negative_ttl=int(os.environ.get('STOCK_SEARCH_NEGATIVE_TTL', str(24 * 60 * 60)))
+)
+
+# Hits and misses of both caches in the metrics (Options -> Diagnostics)
+def cache_metrics():
+    samples = []
+    for name, cache in (("series", series_cache), ("search", search_cache)):
+        stats = cache.stats()
+        samples.append(("stock_cache_hits_total", {"cache": name}, stats["hits"] + stats.get("negative hits", 0)))
+        samples.append(("stock_cache_misses_total", {"cache": name}, stats["misses"]))
+        samples.append(("stock_cache_hit_ratio", {"cache": name}, round(stats["hit ratio"], 4)))
+        samples.append(("stock_cache_entries", {"cache": name}, stats["entries"]))
+    samples.append(("stock_cache_bytes", {"cache": "series"}, series_cache.stats()["bytes"]))
+    return samples
+
+metrics.register(cache_metrics)
+
+# Local symbol search (built from symbols_2.txt on first use, the search results of AlphaVantage are added)
+symbol_index = SymbolIndex("symbols_2.txt", os.path.join(os.environ.get('STOCK_CACHE_DIR', 'cache'), "symbols.pickle"))
+
+# Endpoint and json key of the time series for each interval (weekly endpoint has no compact output),
+# "fx" are daily exchange rates, the symbol is the currency pair (EURUSD -> USD per EUR)
+SERIES = {
+    "daily": ("TIME_SERIES_DAILY_ADJUSTED", "Time Series (Daily)"),
+    "weekly": ("TIME_SERIES_WEEKLY_ADJUSTED", "Weekly Adjusted Time Series"),
+    "fx": ("FX_DAILY", "Time Series FX (Daily)"),
+}
+COMPACT_DAYS = 140  # compact output of the daily endpoint covers the latest 100 trading days (~140 days)
+
+# Symbols pinned to the watch panel and the calls per minute its refresh may use (the rest stays for the buttons)
+watch_list = WatchList(os.path.join(os.environ.get('STOCK_CACHE_DIR', 'cache'), "watchlist.txt"))
+WATCH_CALLS_PER_MINUTE = float(os.environ.get('WATCH_CALLS_PER_MINUTE', '2'))
+
+def load_series(symbol, interval, priority=INTERACTIVE, start=None):
+    """Function returns (series, error message) for a symbol, the series is read from the cache first
+    and only the missing tail is downloaded when the cached series is stale.
+    With start (YYYY-MM-DD) only the history from this date on is needed, the download stops there"""
+    function, series_key = SERIES[interval]
+    cached = series_cache.load(symbol, interval)
+    if cached is not None and (len(cached) == 0 or not cached.columns):
+        cached = None   # Nothing to show or to merge with (stored by an older version)
+    covered = cached is not None and series_cache.covers(symbol, interval, start)
+    if covered and not series_cache.is_stale(symbol, interval):
+        return cached, ""
+    outputsize = "full"
+    if covered:
+        # Only the tail is missing: the answer (newest first) is read up to the last but one cached date,
+        # this bar is in both series and shows whether the history was adjusted in the meantime
+        first_date = series_cache.first_date(symbol, interval)
+        stop_before = str(cached.dates[max(len(cached) - 2, 0)])
+        # Compact is enough if the cached series ends within the last 100 trading days
+        if interval in ("daily", "fx") and (np.datetime64("today", "D") - cached.dates[-1]).astype(int) < COMPACT_DAYS:
+            outputsize = "compact"
+    else:
+        first_date = stop_before = str(start) if start is not None else None
+    if interval == "fx":
+        params = {"from_symbol": symbol[:3], "to_symbol": symbol[3:]}
+    else:
+        params = {"symbol": symbol}
+    data = alphavantage.query_series(function, KEYS, series_key, priority, stop_before=stop_before,
+                                     outputsize=outputsize, **params)
+    if "Error Message" in data or "Note" in data or series_key not in data:
+        # Rather show the stale (or shorter) series than nothing at all
+        if cached is not None:
+            return cached, ""
+        if "Note" in data:
+            return None, "AlphaVantage API Call frequency exceeded!"
+        return None, "Ticker Symbol not found!"
+    series = data[series_key]
+    if len(series) == 0:
+        # e.g. start is after the latest trading day (a weekend), an empty series is never cached
+        if cached is not None:
+            return cached, ""
+        return None, "No trading days in the given time frame!" if start is not None else "Ticker Symbol not found!"
+    if covered and cached.continues(series):
+        series = cached.merge(series)   # Newer values overwrite the cached ones (e.g. the unfinished latest day)
+    elif covered:
+        # Dividend or split since the last download: merging the tail would leave a jump in the adjusted prices,
+        # the whole history is downloaded again
+        data = alphavantage.query_series(function, KEYS, series_key, priority, stop_before=first_date,
+                                         outputsize="full", **params)
+        if "Error Message" in data or "Note" in data or len(data.get(series_key, [])) == 0:
+            return cached, ""
+        series = data[series_key]
+    series = series_cache.store(symbol, interval, series, first_date)
+    return series, ""
+
+# Downloads the daily series of the most used symbols (and then of the whole ticker list) while the user is idle,
+# started by the GUI, STOCK_PREFETCH=0 switches it off
+prefetcher = Prefetcher(
+    load=lambda symbol: load_series(symbol, "daily", BACKGROUND),
+    cache=series_cache,
+    tickers=symbol_index.tickers,
+    apikey=KEYS,
+    path=os.path.join(os.environ.get('STOCK_CACHE_DIR', 'cache'), "prefetch.json"),
+    idle_seconds=int(os.environ.get('STOCK_PREFETCH_IDLE', '30')),
+    reserve_per_day=int(os.environ.get('STOCK_PREFETCH_RESERVE_PER_DAY', '100'))
+)
+PREFETCH = os.environ.get('STOCK_PREFETCH', '1') != '0'
+
+def get_series(symbol, start, end):
+    """Function returns (series, error message) with the daily prices of a stock (symbol) in the given time frame
+    (only the trading days which are in the series are returned, start and end are included)"""
+    series, error = load_series(symbol, "daily", start=start)
+    if series is None:
+        return None, error
+    return series.slice(start, end), ""
+
+def get_graph(symbol, start, end):
+    """Function returns a list of all closure prices for a stock (symbol) in the given time frame (start, end)"""
+    series, error = get_series(symbol, start, end)
+    # Catch error if the series does not exist
+    if series is None:
+        logger.warning("No graph for %s: %s", symbol, error)
+        return [0]
+    return series["adjusted_close"].tolist()
+
+def get_error_infos(message):
+    """Function returns the dictionary of get_infos for a failed call"""
+    return {
+        "name": "NA",
+        "price": "NA",
+        "currency": "NA",
+        "updated": "NA",
+        "region": "NA",
+        "error message": message
+    }
+
+def fetch_symbol_search(keywords, apikey, priority=INTERACTIVE):
+    """Function calls SYMBOL_SEARCH and keeps the result in the search cache (searches without matches for a
+    shorter time)"""
+    data = alphavantage.query("SYMBOL_SEARCH", apikey, priority, keywords=keywords)
+    # Only real answers are cached: a "Note", an "Information" or the "Error Message" of an invalid key say
+    # nothing about the symbol (an unknown symbol gets empty bestMatches)
+    if "bestMatches" in data:
+        search_cache.put(keywords.strip().upper(), data, negative=not data['bestMatches'])
+    return data
+
+def search_symbol(keywords, apikey):
+    """Function returns the SYMBOL_SEARCH payload, from the search cache if possible"""
+    data = search_cache.get(keywords.strip().upper())
+    if data is None:
+        data = fetch_symbol_search(keywords, apikey)
+    return data
+
+def get_infos(symbol, priority=INTERACTIVE):
+    """Function returns a dictionary with all the important information"""
+    # Symbols only consist of letters, digits, "." and "-" -> no need to ask AlphaVantage about anything else
+    if not re.fullmatch(r"[A-Za-z0-9.\-]{1,20}", symbol):
+        return get_error_infos("Ticker Symbol not found!")
+    general = search_cache.get(symbol.upper())
+    if general is not None:
+        # Name, currency and region are cached -> only the quote is needed (nothing at all for a known typo)
+        if "Error Message" in general or not general.get('bestMatches'):
+            return get_error_infos("Ticker Symbol not found!")
+        quote = alphavantage.submit("GLOBAL_QUOTE", KEYS, priority, symbol=symbol)
+    elif symbol in symbol_index:
+        # Known symbol -> both calls at the same time
+        search = alphavantage.executor.submit(fetch_symbol_search, symbol, KEYS, priority)
+        quote = alphavantage.submit("GLOBAL_QUOTE", KEYS, priority, symbol=symbol)
+        general = search.result()
+    else:
+        # Unknown symbol -> only spend the second call if the search found something
+        general = fetch_symbol_search(symbol, KEYS, priority)
+        if "Error Message" in general or general.get('bestMatches') == []:
+            return get_error_infos("Ticker Symbol not found!")
+        quote = alphavantage.submit("GLOBAL_QUOTE", KEYS, priority, symbol=symbol)
+    price = quote.result()
+    # Catch the errors in both requests:
+    if "Error Message" in general or "Error Message" in price:
+        return get_error_infos("Ticker Symbol not found!")
+    elif "Note" in general or "Note" in price:
+        return get_error_infos("AlphaVantage API Call frequency exceeded!")
+    elif general.get('bestMatches', []) == [] or price.get('Global Quote', {}) == {}:
+        return get_error_infos("Ticker Symbol not found!")
+    else:
+        symbol_index.merge(general['bestMatches'])
+        return {
+            "name": general['bestMatches'][0]['2. name'],
+            "price": round(float(price['Global Quote']['05. price']), 2),
+            "currency": general['bestMatches'][0]['8. currency'],
+            "updated": price['Global Quote']['07. latest trading day'],
+            "region": general['bestMatches'][0]['4. region'],
+            "error message": ""
+        }
+
+def get_quote(symbol):
+    """Function returns price, change and date of the latest quote (one GLOBAL_QUOTE call, behind the buttons)"""
+    if not re.fullmatch(r"[A-Za-z0-9.\-]{1,20}", symbol):
+        return {"error message": "Ticker Symbol not found!"}
+    price = alphavantage.query("GLOBAL_QUOTE", KEYS, priority=BACKGROUND, symbol=symbol)
+    if "Error Message" in price:
+        return {"error message": "Ticker Symbol not found!"}
+    elif "Note" in price:
+        return {"error message": "AlphaVantage API Call frequency exceeded!"}
+    elif price.get('Global Quote', {}) == {}:
+        return {"error message": "Ticker Symbol not found!"}
+    return {
+        "price": round(float(price['Global Quote']['05. price']), 2),
+        "change percent": price['Global Quote'].get('10. change percent', ""),
+        "updated": price['Global Quote']['07. latest trading day'],
+        "error message": ""
+    }
+
+def get_search_results(keyword):
+    """Function returns a dictionary with all the important information"""
+    data = search_symbol(keyword, KEYS)
+    return_list = []
+    # Catch the errors in both requests:
+    if "Error Message" in data:
+        return return_list
+    elif "Note" in data:
+        return return_list
+    elif data.get('bestMatches', []) == []:
+        return return_list
+    else:
+        symbol_index.merge(data['bestMatches'])
+        for match in data['bestMatches'][:5]:
+            try:
+                row_list = [match['9. matchScore'], match['2. name'], match['4. region'], match['3. type'], match['1. symbol']]
+            except KeyError:
+                break
+            return_list.append(row_list)
+        return return_list
@@ -0,0 +1,57 @@
+import os
+import json
+import struct
+import numpy as np
+from series import PriceSeries
+
+# Binary file of one PriceSeries:
+#     magic (8 bytes) | length of the header (uint32) | json header | padding | arrays
+# the header holds the number of rows and dtype + offset of every array, the arrays are raw little endian
+# columns (dates as datetime64[D], prices and volume as float64), each aligned to ALIGNMENT bytes
+MAGIC = b"STOCKSR1"
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_series(path, series):
+    """Function writes a PriceSeries to path (via a temporary file, so a crash never leaves half a file)"""
+    arrays = {"dates": np.ascontiguousarray(series.dates, dtype="<M8[D]")}
+    for name, column in series.columns.items():
+        arrays[name] = np.ascontiguousarray(column, dtype="<f8")
+    offsets = {}
+    offset = 0
+    for name, array in arrays.items():
+        offsets[name] = [array.dtype.str, offset]   # Offset from the start of the data
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({"rows": len(series), "arrays": offsets}).encode()
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+    with open(path + ".tmp", "wb") as file:
+        file.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for name, array in arrays.items():
+            file.seek(data_start + offsets[name][1])
+            file.write(array.tobytes())
+    os.replace(path + ".tmp", path)
+
+
+def read_series(path):
+    """Function returns the PriceSeries of a file written by write_series without reading the values:
+    the columns are read-only views of a memory map, the OS loads (and drops) the pages as they are used"""
+    with open(path, "rb") as file:
+        start = file.read(len(MAGIC) + 4)
+        if len(start) < len(MAGIC) + 4 or start[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is no price series file")
+        header_length = struct.unpack("<I", start[len(MAGIC):])[0]
+        header = json.loads(file.read(header_length))
+    data_start = _aligned(len(MAGIC) + 4 + header_length)
+    rows = header["rows"]
+    if rows == 0:   # An empty file cannot be mapped
+        return PriceSeries(np.array([], dtype="datetime64[D]"),
+                           {name: np.array([], dtype=np.float64) for name in header["arrays"] if name != "dates"})
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    arrays = {name: np.frombuffer(buffer, dtype=np.dtype(dtype), count=rows, offset=data_start + offset)
+              for name, (dtype, offset) in header["arrays"].items()}
+    dates = arrays.pop("dates")
+    return PriceSeries(dates, arrays)
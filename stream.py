@@ -0,0 +1,98 @@
+import re
+import json
+import codecs
+import numpy as np
+from series import PriceSeries, COLUMNS
+
+# The entries of a time series are flat ("2020-12-31": {"1. open": "...", ...}), so every "}" inside the series
+# ends an entry and "}" followed by "}" ends the series
+SERIES_END = re.compile(r'\}\s*\}')
+CHUNK_SIZE = 64 * 1024
+
+
+class SeriesParser(object):
+    """Class parses the time series of an AlphaVantage answer chunk by chunk while it is downloaded: only the
+    unparsed rest of the text is kept, every chunk of entries is converted to NumPy columns right away.
+    AlphaVantage sends the newest date first, so with stop_before (YYYY-MM-DD) the parser is done
+    at the first older date and the rest of the answer is never downloaded."""
+
+    def __init__(self, series_key, stop_before=None):
+        self.key = re.compile(r'"%s"\s*:\s*\{' % re.escape(series_key))
+        self.series_key = series_key
+        self.stop_before = str(stop_before) if stop_before else None    # ISO dates compare like strings
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.prefix = None      # Text in front of the series (the meta data)
+        self.done = False
+        self.dates = []         # Arrays of the parsed chunks
+        self.columns = {}       # name -> arrays of the parsed chunks
+        self.bytes = 0
+
+    def feed(self, chunk):
+        """Method parses the next chunk of the answer, returns True once no more data is needed"""
+        self.bytes += len(chunk)
+        self.buffer += self.decoder.decode(chunk)
+        if self.prefix is None:
+            match = self.key.search(self.buffer)
+            if match is None:   # Still in the meta data (or an answer without series like a "Note")
+                return False
+            self.prefix = self.buffer[:match.start()]
+            self.buffer = self.buffer[match.end():]
+        # Everything up to the last complete entry is decoded at once (json is much faster than parsing by hand)
+        match = SERIES_END.search(self.buffer)
+        if self.buffer.lstrip().startswith("}"):    # Nothing left (or an empty series)
+            end = 0
+            self.done = True
+        elif match is not None:
+            end = match.start() + 1
+            self.done = True
+        else:
+            end = self.buffer.rfind("}") + 1
+        text = self.buffer[:end].strip().lstrip(",")
+        self.buffer = self.buffer[end:]
+        if text:
+            self._add(json.loads("{" + text + "}"))
+        return self.done
+
+    def _add(self, time_series):
+        dates = list(time_series)
+        if self.stop_before is not None and dates[-1] < self.stop_before:
+            dates = [date for date in dates if date >= self.stop_before]
+            self.done = True
+            if not dates:
+                return
+        bars = [time_series[date] for date in dates]
+        self.dates.append(np.array(dates, dtype="datetime64[D]"))
+        for key, name in COLUMNS.items():
+            if key in bars[0]:
+                # numpy converts the whole column of strings at once (like PriceSeries.from_json)
+                self.columns.setdefault(name, []).append(np.array([bar[key] for bar in bars]).astype(np.float64))
+
+    def finish(self):
+        """Method returns the decoded answer like r.json(), with a PriceSeries instead of the time series dict"""
+        if self.prefix is None:     # "Note", "Error Message" etc. are small, decoded as a whole
+            return json.loads(self.buffer + self.decoder.decode(b"", final=True))
+        if not self.done:
+            raise ValueError("Incomplete time series (connection closed)")
+        try:
+            data = json.loads(self.prefix.rstrip().rstrip(",") + "}")
+        except ValueError:
+            data = {}
+        dates = np.concatenate(self.dates) if self.dates else np.array([], dtype="datetime64[D]")
+        order = np.argsort(dates, kind="stable")    # Newest first -> oldest first
+        data[self.series_key] = PriceSeries(dates[order], {name: np.concatenate(arrays)[order]
+                                                           for name, arrays in self.columns.items()})
+        return data
+
+
+def parse_response(response, series_key, stop_before=None, chunk_size=CHUNK_SIZE):
+    """Function reads a streamed requests response chunk by chunk, returns (decoded answer, bytes read),
+    the connection is closed as soon as the parser has what it needs"""
+    parser = SeriesParser(series_key, stop_before)
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if parser.feed(chunk):
+                break
+    finally:
+        response.close()
+    return parser.finish(), parser.bytes
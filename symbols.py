@@ -0,0 +1,169 @@
+import os
+import csv
+import pickle
+import bisect
+import threading
+from collections import Counter
+
+# Region of a symbol by its suffix (see readme), symbols without suffix are US listings
+REGIONS = {".DE": "Germany", ".LON": "United Kingdom", ".SWI": "Switzerland", ".PA": "France", ".MIL": "Italy"}
+MIN_FUZZY_SCORE = 0.3   # Fuzzy matches below this trigram similarity are not shown
+SURE_FUZZY_SCORE = 0.7  # Fuzzy matches from this similarity on answer a search without asking AlphaVantage
+
+
+def trigrams(text):
+    """Function returns the trigrams of a text (padded, so short words have trigrams as well)"""
+    text = f"  {text.upper()} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SymbolIndex(object):
+    """Class answers symbol searches locally: a sorted list of symbols for prefix matches and a trigram index
+    of symbols and company names for fuzzy matches. The index is built from the symbols file on first use
+    and kept in a binary cache, results of the AlphaVantage search are merged into it."""
+
+    def __init__(self, source="symbols_2.txt", cache_path=os.path.join("cache", "symbols.pickle")):
+        self.source = source
+        self.cache_path = cache_path
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.order = []         # Symbols in the order of the symbols file (for the completer)
+        self.entries = {}       # symbol -> {"name", "region", "type", "currency"}
+        self.symbols = []       # Sorted symbols for prefix matches
+        self.grams = {}         # trigram -> set of symbols
+
+    def _load(self):
+        if self.loaded:
+            return
+        try:
+            source_mtime = os.path.getmtime(self.source)
+        except OSError:
+            source_mtime = None
+        try:
+            with open(self.cache_path, "rb") as file:
+                cached = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            cached = None
+        if cached is not None and cached["source_mtime"] == source_mtime:
+            self.order, self.entries, self.symbols, self.grams = \
+                cached["order"], cached["entries"], cached["symbols"], cached["grams"]
+        else:
+            self._build(cached["entries"] if cached is not None else {})
+            self._save(source_mtime)
+        self.loaded = True
+
+    def _build(self, known):
+        """Method parses the symbols file, names which were merged before are kept (known)"""
+        self.order = []
+        if os.path.exists(self.source):
+            with open(self.source, "r") as file:
+                for row in csv.reader(file, delimiter=","):
+                    for ticker in row:
+                        if ticker.strip():
+                            self.order.append(ticker.strip())
+        self.entries = dict(known)
+        for symbol in self.order:
+            if symbol.upper() not in self.entries:
+                suffix = symbol[symbol.rfind("."):].upper() if "." in symbol else ""
+                self.entries[symbol.upper()] = {
+                    "name": "", "region": REGIONS.get(suffix, "United States"), "type": "Equity", "currency": ""
+                }
+        self.symbols = sorted(self.entries)
+        self.grams = {}
+        for symbol in self.entries:
+            self._add_grams(symbol)
+
+    def _add_grams(self, symbol):
+        for gram in trigrams(symbol) | trigrams(self.entries[symbol]["name"]):
+            self.grams.setdefault(gram, set()).add(symbol)
+
+    def _save(self, source_mtime):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(self.cache_path, "wb") as file:
+                pickle.dump({"source_mtime": source_mtime, "order": self.order, "entries": self.entries,
+                             "symbols": self.symbols, "grams": self.grams}, file, pickle.HIGHEST_PROTOCOL)
+        except OSError:     # The index still works, it is just rebuilt on the next start
+            pass
+
+    def tickers(self):
+        with self.lock:
+            self._load()
+            return list(self.order)
+
+    def __contains__(self, symbol):
+        with self.lock:
+            self._load()
+            return symbol.upper() in self.entries
+
+    def info(self, symbol):
+        """Method returns name, region, type and currency of a symbol (None if the symbol is unknown)"""
+        with self.lock:
+            self._load()
+            entry = self.entries.get(symbol.upper())
+            return dict(entry) if entry is not None else None
+
+    def search(self, keyword, limit=5):
+        """Method returns up to limit rows [match score, name, region, type, symbol] like get_search_results"""
+        return self.lookup(keyword, limit)[0]
+
+    def lookup(self, keyword, limit=5):
+        """Method returns (rows of search, sure): sure is True if a symbol starts with the keyword, a company name
+        is the keyword (or starts with it) or a fuzzy match is very close. Otherwise the local rows are only a guess
+        (most entries of the symbols file have no company name) and AlphaVantage should be asked as well"""
+        keyword = keyword.strip().upper()
+        if not keyword:
+            return [], False
+        with self.lock:
+            self._load()
+            scores = {}
+            sure = False
+            # Prefix matches of the symbol (binary search in the sorted symbols)
+            i = bisect.bisect_left(self.symbols, keyword)
+            while i < len(self.symbols) and self.symbols[i].startswith(keyword):
+                scores[self.symbols[i]] = len(keyword) / len(self.symbols[i])
+                sure = True
+                i += 1
+            # Fuzzy matches of symbol and name (share of common trigrams)
+            grams = trigrams(keyword)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.grams.get(gram, ()))
+            for symbol, count in shared.items():
+                entry = self.entries[symbol]
+                name = entry["name"].upper()
+                if name and (name == keyword or name.startswith(keyword + " ")):
+                    scores[symbol] = 1.0
+                    sure = True
+                    continue
+                score = max(count / len(grams | trigrams(symbol)),
+                            count / len(grams | trigrams(name)) if name else 0)
+                if score >= MIN_FUZZY_SCORE and score > scores.get(symbol, 0):
+                    scores[symbol] = score
+                    sure = sure or score >= SURE_FUZZY_SCORE
+            best = sorted(scores, key=lambda symbol: (-scores[symbol], symbol))[:limit]
+            return [[f"{scores[symbol]:.4f}", self.entries[symbol]["name"], self.entries[symbol]["region"],
+                     self.entries[symbol]["type"], symbol] for symbol in best], sure
+
+    def merge(self, matches):
+        """Method adds the bestMatches of an AlphaVantage search to the index (and its binary cache)"""
+        with self.lock:
+            self._load()
+            for match in matches:
+                symbol = match.get("1. symbol", "").upper()
+                if not symbol:
+                    continue
+                if symbol not in self.entries:
+                    bisect.insort(self.symbols, symbol)
+                self.entries[symbol] = {
+                    "name": match.get("2. name", ""),
+                    "region": match.get("4. region", ""),
+                    "type": match.get("3. type", ""),
+                    "currency": match.get("8. currency", ""),
+                }
+                self._add_grams(symbol)
+            try:
+                source_mtime = os.path.getmtime(self.source)
+            except OSError:
+                source_mtime = None
+            self._save(source_mtime)
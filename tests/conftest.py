@@ -0,0 +1,56 @@
+import os
+import atexit
+import shutil
+import tempfile
+import pytest
+
+# The tests never call AlphaVantage and never touch the cache of the application: everything runs against
+# mock_server.py with its own cache directory (set before stockdata reads the env.)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ["STOCK_CACHE_DIR"] = tempfile.mkdtemp(prefix="stock-tests-")
+atexit.register(shutil.rmtree, os.environ["STOCK_CACHE_DIR"], True)
+os.environ["STOCK_PREFETCH"] = "0"
+os.environ["OPX_KEY"] = os.environ["QTW_KEY"] = "demo"     # The mock server does not check the keys
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")     # No display needed for the Qt parts
+os.chdir(ROOT)  # symbols_2.txt is found relative to the working directory like in the application
+
+import alphavantage
+import stockdata
+from cache import SeriesCache, TTLCache
+from symbols import SymbolIndex
+from ratelimit import Scheduler
+from mock_server import start_server
+
+# Hand-written sample answers for IBM (synthetic prices in AlphaVantage's format, no recordings), the tests use
+# IBM only where these are meant to be served and other symbols for the synthetic answers
+FIXTURES = os.path.join(ROOT, "tests", "samples")
+
+
+@pytest.fixture(scope="session")
+def mock_server():
+    """Mock server (sample answers first, otherwise synthetic answers) for the whole test session"""
+    server, url = start_server(fixtures=FIXTURES)
+    yield server, url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def server(mock_server, monkeypatch, tmp_path):
+    """Points the data layer to the mock server with an empty cache and a budget no test can use up,
+    returns the server with server.requests: the parameters of every call it answered"""
+    server, url = mock_server
+    server.requests = []
+    answer = server.answer
+
+    def recording_answer(params):
+        server.requests.append(params)
+        return answer(params)
+
+    monkeypatch.setattr(server, "answer", recording_answer)
+    monkeypatch.setattr(alphavantage, "BASE_URL", url)
+    monkeypatch.setattr(alphavantage, "scheduler", Scheduler(per_minute=100000, per_day=10 ** 6))
+    monkeypatch.setattr(stockdata, "series_cache", SeriesCache(str(tmp_path / "series")))
+    monkeypatch.setattr(stockdata, "search_cache", TTLCache(str(tmp_path / "search.json")))
+    monkeypatch.setattr(stockdata, "symbol_index", SymbolIndex("symbols_2.txt", str(tmp_path / "symbols.pickle")))
+    return server
@@ -0,0 +1,48 @@
+import csv
+import numpy as np
+import alphavantage
+from batch import run_batch, read_watchlist
+from ratelimit import BACKGROUND
+
+
+def read_rows(path):
+    with open(path, newline="") as file:
+        return {row["symbol"]: row for row in csv.DictReader(file)}
+
+
+def test_read_watchlist(tmp_path):
+    path = tmp_path / "watchlist.txt"
+    path.write_text("AAPL, MSFT,\nAAPL, IBM\n")
+    assert read_watchlist(str(path)) == ["AAPL", "MSFT", "IBM"]
+
+
+def test_run_batch(server, tmp_path):
+    start, end = str(np.datetime64("today", "D") - 60), str(np.datetime64("today", "D"))
+    output = str(tmp_path / "result.csv")
+    run_batch(["AAPL", "MSFT", "NOPE"], output, start, end, workers=2)
+    rows = read_rows(output)
+    assert sorted(rows) == ["AAPL", "MSFT", "NOPE"]
+    assert rows["AAPL"]["error message"] == ""
+    assert rows["AAPL"]["first_date"] >= start
+    assert int(rows["MSFT"]["trading_days"]) > 30
+    assert rows["NOPE"]["error message"] == "Ticker Symbol not found!"
+    # A resumed run only fetches the symbols which are not done yet
+    calls = len(server.requests)
+    run_batch(["AAPL", "MSFT", "NOPE", "KO"], output, start, end, workers=2, resume=True)
+    assert sorted(read_rows(output)) == ["AAPL", "KO", "MSFT", "NOPE"]
+    assert {request.get("symbol", request.get("keywords")) for request in server.requests[calls:]} == {"KO"}
+
+
+def test_batch_calls_are_background(server, tmp_path, monkeypatch):
+    priorities = []
+    acquire_any = alphavantage.scheduler.acquire_any
+
+    def recording_acquire_any(keys, priority):
+        priorities.append(priority)
+        return acquire_any(keys, priority)
+
+    monkeypatch.setattr(alphavantage.scheduler, "acquire_any", recording_acquire_any)
+    start, end = str(np.datetime64("today", "D") - 30), str(np.datetime64("today", "D"))
+    run_batch(["AAPL", "NOPE"], str(tmp_path / "result.csv"), start, end, workers=2)
+    assert len(priorities) == len(server.requests) > 0
+    assert set(priorities) == {BACKGROUND}
@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import stockdata
+from cache import SeriesCache, TTLCache
+
+pytest.importorskip("pytest_benchmark")
+
+# Quote, graph and search end to end through the whole client (rate limit, http, json, cache) against the mock
+# server, every call is a cache miss. pytest-benchmark prints the table, with --benchmark-skip they are left out.
+# Quote and search latency are measured on IBM (sample answers), graph latency on the synthetic full history of
+# AAPL (5200 bars like a real full download), throughput on synthetic symbols
+LATENCY = 0.02  # Seconds the mock server adds to every answer
+WORKERS = 8     # Threads of the throughput benchmarks
+CALLS = 16      # Calls per round of the throughput benchmarks
+
+CASES = {
+    "quote": lambda symbol: stockdata.get_infos(symbol),
+    "graph": lambda symbol: stockdata.load_series(symbol, "daily"),
+    "search": lambda symbol: stockdata.get_search_results(symbol),
+}
+LATENCY_SYMBOLS = {"quote": "IBM", "graph": "AAPL", "search": "IBM"}
+
+
+@pytest.fixture
+def empty_caches(server, monkeypatch, tmp_path_factory):
+    """Returns a function which gives the data layer new empty caches (called before every round)"""
+    monkeypatch.setattr(server, "latency", LATENCY)
+
+    def empty():
+        directory = tmp_path_factory.mktemp("cache")
+        monkeypatch.setattr(stockdata, "series_cache", SeriesCache(str(directory)))
+        monkeypatch.setattr(stockdata, "search_cache", TTLCache(str(directory / "search.json")))
+
+    return empty
+
+
+def check(case, result):
+    if case == "quote":
+        assert result["error message"] == ""
+    elif case == "graph":
+        assert result[1] == ""
+    else:
+        assert result
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_latency(benchmark, empty_caches, case):
+    benchmark.group = "latency"
+
+    def setup():
+        empty_caches()
+        return (LATENCY_SYMBOLS[case],), {}
+
+    result = benchmark.pedantic(CASES[case], setup=setup, rounds=10)
+    check(case, result)
+    if case == "graph":
+        assert len(result[0]) == 5200
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_throughput(benchmark, empty_caches, case):
+    benchmark.group = f"throughput ({CALLS} calls, {WORKERS} threads)"
+    symbols = stockdata.symbol_index.tickers()[:CALLS]
+
+    def setup():
+        empty_caches()
+        return (symbols,), {}
+
+    def run(symbols):
+        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+            return list(executor.map(CASES[case], symbols))
+
+    results = benchmark.pedantic(run, setup=setup, rounds=5)
+    for result in results:
+        check(case, result)
+    benchmark.extra_info["calls per second"] = round(CALLS / benchmark.stats.stats.mean, 1)
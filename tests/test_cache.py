@@ -0,0 +1,118 @@
+import os
+import time
+import numpy as np
+from series import PriceSeries
+from cache import SeriesCache, TTLCache
+
+
+def make_series(days=10, end="2020-12-31"):
+    dates = np.arange(np.datetime64(end) - days + 1, np.datetime64(end) + 1)
+    close = np.linspace(100, 110, days)
+    return PriceSeries(dates, {"close": close, "adjusted_close": close})
+
+
+def test_store_and_load(tmp_path):
+    cache = SeriesCache(str(tmp_path))
+    assert cache.load("AAPL", "daily") is None
+    cache.store("AAPL", "daily", make_series())
+    series = cache.load("aapl", "daily")
+    assert len(series) == 10
+    assert series["close"][-1] == 110
+    assert series.dates[-1] == np.datetime64("2020-12-31")
+    # A new instance finds the series through the index
+    assert len(SeriesCache(str(tmp_path)).load("AAPL", "daily")) == 10
+
+
+def test_hits_and_misses(tmp_path):
+    cache = SeriesCache(str(tmp_path))
+    cache.load("AAPL", "daily")
+    cache.store("AAPL", "daily", make_series())
+    cache.load("AAPL", "daily")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["hit ratio"]) == (1, 1, 1, 0.5)
+
+
+def test_stale(tmp_path):
+    cache = SeriesCache(str(tmp_path), max_age=0)
+    assert cache.is_stale("AAPL", "daily")
+    cache.store("AAPL", "daily", make_series())
+    time.sleep(0.01)
+    assert cache.is_stale("AAPL", "daily")
+    cache.max_age = 60
+    assert not cache.is_stale("AAPL", "daily")
+
+
+def test_covers(tmp_path):
+    cache = SeriesCache(str(tmp_path))
+    cache.store("AAPL", "daily", make_series(), first_date="2020-12-22")
+    cache.store("MSFT", "daily", make_series())
+    assert cache.first_date("AAPL", "daily") == "2020-12-22"
+    assert cache.covers("AAPL", "daily", "2020-12-25")
+    assert not cache.covers("AAPL", "daily", "2020-12-01")
+    assert not cache.covers("AAPL", "daily")    # Full history asked for, only a part is cached
+    assert cache.covers("MSFT", "daily", "1999-01-01")
+    assert not cache.covers("IBM", "daily")
+
+
+def test_least_recently_used_series_evicted(tmp_path):
+    cache = SeriesCache(str(tmp_path))
+    cache.store("A", "daily", make_series())
+    cache.max_bytes = 2 * cache.index["daily_A"]["size"]
+    cache.store("B", "daily", make_series())
+    cache.load("A", "daily")
+    cache.store("C", "daily", make_series())
+    assert cache.load("B", "daily") is None
+    assert cache.load("A", "daily") is not None
+    assert cache.load("C", "daily") is not None
+
+
+def test_index_written_atomically(tmp_path):
+    cache = SeriesCache(str(tmp_path))
+    cache.store("AAPL", "daily", make_series())
+    assert sorted(name for name in os.listdir(tmp_path) if not name.endswith(".bin")) == ["index.json"]
+
+
+def test_access_times_written_lazily(tmp_path):
+    cache = SeriesCache(str(tmp_path))
+    cache.store("AAPL", "daily", make_series())
+    with open(cache.index_path) as file:
+        written = file.read()
+    cache.load("AAPL", "daily")
+    with open(cache.index_path) as file:
+        assert file.read() == written
+    cache.flush()
+    with open(cache.index_path) as file:
+        assert file.read() != written
+
+
+def test_orphans_removed(tmp_path):
+    cache = SeriesCache(str(tmp_path))
+    cache.store("AAPL", "daily", make_series())
+    cache.store("AAPL", "daily", make_series(days=5))    # Replaces the file of the series
+    orphan = tmp_path / "daily_MSFT.1.bin"
+    orphan.write_bytes(b"left over")
+    cache = SeriesCache(str(tmp_path))
+    assert not orphan.exists()
+    assert sorted(os.listdir(tmp_path)) == sorted(["index.json", cache.index["daily_AAPL"]["file"]])
+    assert len(cache.load("AAPL", "daily")) == 5
+
+
+def test_broken_index_keeps_files(tmp_path):
+    cache = SeriesCache(str(tmp_path))
+    cache.store("AAPL", "daily", make_series())
+    series_file = cache.index["daily_AAPL"]["file"]
+    (tmp_path / "index.json").write_text("{broken")
+    cache = SeriesCache(str(tmp_path))
+    assert cache.load("AAPL", "daily") is None
+    assert (tmp_path / series_file).exists()
+
+
+def test_ttl_cache(tmp_path):
+    cache = TTLCache(str(tmp_path / "search.json"), ttl=60, negative_ttl=0)
+    cache.put("AAPL", {"bestMatches": [1]})
+    cache.put("NOPE", {"bestMatches": []}, negative=True)
+    time.sleep(0.01)
+    assert cache.get("AAPL") == {"bestMatches": [1]}
+    assert cache.get("NOPE") is None
+    assert cache.stats()["hits"] == 1
+    assert TTLCache(str(tmp_path / "search.json")).get("AAPL") == {"bestMatches": [1]}
@@ -0,0 +1,19 @@
+import csv
+import numpy as np
+import stockdata
+from export import run_export
+
+
+def test_export_summary(server, tmp_path):
+    stockdata.load_series("AAPL", "daily")
+    start, end = str(np.datetime64("today", "D") - 60), str(np.datetime64("today", "D"))
+    directory = str(tmp_path / "export")
+    run_export(["AAPL", "MSFT"], directory, start, end, workers=1)
+    with open(tmp_path / "export" / "summary.csv", newline="") as file:
+        rows = {row["symbol"]: row for row in csv.DictReader(file)}
+    assert rows["AAPL"]["error message"] == ""
+    assert rows["AAPL"]["currency"] == "USD"
+    assert rows["AAPL"]["charts"]
+    # Not in the cache: no chart and no currency
+    assert rows["MSFT"]["error message"].startswith("Not cached")
+    assert rows["MSFT"]["currency"] == ""
@@ -0,0 +1,75 @@
+import os
+import json
+from datetime import date
+import requests
+import alphavantage
+import stockdata
+from mock_server import fixture_name, start_server, NOTE, ERROR
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+
+
+def get(url, **params):
+    return requests.get(url, params=dict(params, apikey="demo"), timeout=10).json()
+
+
+def test_fixture_names():
+    assert fixture_name({"function": "GLOBAL_QUOTE", "symbol": "ibm", "apikey": "x"}) == "GLOBAL_QUOTE_IBM.json"
+    assert fixture_name({"function": "SYMBOL_SEARCH", "keywords": "International Business"}) == \
+        "SYMBOL_SEARCH_INTERNATIONAL_BUSINESS.json"
+    assert fixture_name({"function": "FX_DAILY", "from_symbol": "EUR", "to_symbol": "USD"}) == \
+        "FX_DAILY_EUR_USD.json"
+
+
+def test_sample_answers_are_served(mock_server):
+    server, url = mock_server
+    calls = [
+        {"function": "GLOBAL_QUOTE", "symbol": "IBM"},
+        {"function": "SYMBOL_SEARCH", "keywords": "IBM"},
+        {"function": "SYMBOL_SEARCH", "keywords": "International Business"},
+        {"function": "TIME_SERIES_DAILY_ADJUSTED", "symbol": "IBM", "outputsize": "compact"},
+    ]
+    assert sorted(map(fixture_name, calls)) == sorted(os.listdir(FIXTURES))
+    for params in calls:
+        with open(os.path.join(FIXTURES, fixture_name(params))) as file:
+            assert get(url, **params) == json.load(file)
+
+
+def test_synthetic_answers(mock_server):
+    server, url = mock_server
+    assert len(get(url, function="TIME_SERIES_DAILY_ADJUSTED", symbol="AAPL")["Time Series (Daily)"]) == 100
+    assert get(url, function="TIME_SERIES_DAILY_ADJUSTED", symbol="NOPE") == ERROR
+    assert get(url, function="GLOBAL_QUOTE", symbol="MSFT") == get(url, function="GLOBAL_QUOTE", symbol="MSFT")
+    assert "bestMatches" in get(url, function="SYMBOL_SEARCH", keywords="micro")
+
+
+def test_weekly_series_end_on_fridays(mock_server):
+    server, url = mock_server
+    weekly = get(url, function="TIME_SERIES_WEEKLY_ADJUSTED", symbol="AAPL")["Weekly Adjusted Time Series"]
+    assert all(date.fromisoformat(day).weekday() == 4 for day in weekly)
+
+
+def test_injected_failures():
+    server, url = start_server(per_minute=2)
+    try:
+        assert "Global Quote" in get(url, function="GLOBAL_QUOTE", symbol="AAPL")
+        assert "Global Quote" in get(url, function="GLOBAL_QUOTE", symbol="AAPL")
+        assert get(url, function="GLOBAL_QUOTE", symbol="AAPL") == NOTE
+        server.per_minute = 0
+        server.error_rate = 1.0
+        assert get(url, function="GLOBAL_QUOTE", symbol="AAPL") == ERROR
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_data_layer_on_samples(server):
+    infos = stockdata.get_infos("IBM")
+    assert infos["name"] == "International Business Machines Corp"
+    assert infos["updated"] == "2026-10-16"
+    data = alphavantage.query_series("TIME_SERIES_DAILY_ADJUSTED", "demo", "Time Series (Daily)",
+                                     outputsize="compact", symbol="IBM")
+    series = data["Time Series (Daily)"]
+    assert (len(series), str(series.dates[-1])) == (100, "2026-10-16")
+    rows = stockdata.get_search_results("International Business")
+    assert [row[4] for row in rows] == ["IBM", "IBM.LON"]
@@ -0,0 +1,129 @@
+import time
+import threading
+import alphavantage
+from ratelimit import TokenBucket, KeyPool, Scheduler, INTERACTIVE, BACKGROUND, keys_of
+from mock_server import start_server
+
+
+def test_bucket_allows_per_minute_calls():
+    bucket = TokenBucket(per_minute=3, per_day=10)
+    for _ in range(3):
+        assert bucket.wait_time() == 0
+        bucket.take()
+    assert bucket.wait_time() > 0
+    bucket.block(0.05)
+    assert bucket.wait_time() > 0
+
+
+def test_bucket_daily_budget():
+    bucket = TokenBucket(per_minute=10, per_day=2)
+    bucket.take()
+    bucket.take()
+    assert bucket.wait_time() is None
+
+
+def test_bucket_remaining_budget():
+    bucket = TokenBucket(per_minute=3, per_day=10)
+    bucket.take()
+    bucket.take()
+    assert bucket.remaining() == (1, 8)
+    assert bucket.calls_last_minute() == 2
+
+
+def test_key_pool():
+    # Each key once, unset keys are left out, a pool without keys still makes calls (without key)
+    assert list(KeyPool(["a", None, "b", "a"])) == ["a", "b"]
+    assert list(KeyPool([None, ""])) == [None]
+    assert keys_of(KeyPool(["a", "b"])) == ["a", "b"]
+    assert keys_of("a") == ["a"]
+
+
+def test_acquire_until_daily_budget_used_up():
+    scheduler = Scheduler()
+    scheduler.configure("a", "A", per_minute=10, per_day=2)
+    assert scheduler.acquire("a")
+    assert scheduler.acquire("a")
+    assert not scheduler.acquire("a")
+    assert scheduler.stats()["A"] == {"queued": 0, "throttled": 1, "served": 2}
+
+
+def test_budget():
+    scheduler = Scheduler()
+    scheduler.configure("a", "A", per_minute=10, per_day=20)
+    scheduler.acquire("a")
+    budget = scheduler.budget()["A"]
+    assert (budget["used today"], budget["per day"], budget["per minute"]) == (1, 20, 10)
+    assert scheduler.label("a") == "A"
+
+
+def test_acquire_any_takes_key_with_most_budget_left():
+    scheduler = Scheduler()
+    scheduler.configure("a", "A", per_minute=10, per_day=100)
+    scheduler.configure("b", "B", per_minute=10, per_day=100)
+    scheduler.acquire("a")
+    assert scheduler.acquire_any(["a", "b"]) == (True, "b")
+    # A throttled key is skipped while it is blocked
+    scheduler.throttled("b")
+    assert scheduler.acquire_any(["a", "b"]) == (True, "a")
+    assert scheduler.stats()["B"]["throttled"] == 1
+
+
+def test_acquire_any_unset_key():
+    # An unset key (None) is a key like any other, only a used-up budget refuses the call
+    scheduler = Scheduler()
+    scheduler.configure(None, "API_KEY", per_minute=10, per_day=1)
+    assert scheduler.acquire_any([None]) == (True, None)
+    assert scheduler.acquire_any([None]) == (False, None)
+
+
+def test_acquire_any_counts_every_used_up_key():
+    scheduler = Scheduler()
+    scheduler.configure("a", "A", per_minute=10, per_day=1)
+    scheduler.configure("b", "B", per_minute=10, per_day=1)
+    scheduler.acquire("a")
+    scheduler.acquire("b")
+    assert scheduler.acquire_any(["a", "b"]) == (False, None)
+    assert scheduler.stats()["A"]["throttled"] == 1
+    assert scheduler.stats()["B"]["throttled"] == 1
+
+
+def test_interactive_calls_go_first():
+    scheduler = Scheduler()
+    scheduler.configure("a", "A", per_minute=120, per_day=100)    # A new token every 0.5 s
+    scheduler.throttled("a", 0.1)     # Empty bucket, both callers have to wait
+    served = []
+
+    def caller(priority):
+        scheduler.acquire("a", priority)
+        served.append(priority)
+
+    background = threading.Thread(target=caller, args=(BACKGROUND,))
+    background.start()
+    while not scheduler.waiting_count(BACKGROUND):
+        time.sleep(0.001)
+    interactive = threading.Thread(target=caller, args=(INTERACTIVE,))
+    interactive.start()
+    background.join(5)
+    interactive.join(5)
+    assert served == [INTERACTIVE, BACKGROUND]
+    assert scheduler.stats()["A"]["queued"] == 2
+
+
+def test_pool_fails_over_after_note(monkeypatch):
+    # The mock server allows one call per minute and key: the key with the most budget left ("a") was used already,
+    # the call is throttled there and retried with the other key of the pool
+    server, url = start_server(per_minute=1)
+    try:
+        scheduler = Scheduler()
+        scheduler.configure("a", "A", per_minute=100, per_day=1000)
+        scheduler.configure("b", "B", per_minute=50, per_day=1000)
+        monkeypatch.setattr(alphavantage, "BASE_URL", url)
+        monkeypatch.setattr(alphavantage, "scheduler", scheduler)
+        assert "Global Quote" in alphavantage.query("GLOBAL_QUOTE", "a", symbol="AAPL")
+        data = alphavantage.query("GLOBAL_QUOTE", KeyPool(["a", "b"]), symbol="AAPL")
+        assert data["Global Quote"]["01. symbol"] == "AAPL"
+        assert scheduler.stats()["A"] == {"queued": 0, "throttled": 1, "served": 2}
+        assert scheduler.stats()["B"] == {"queued": 0, "throttled": 0, "served": 1}
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,81 @@
+import numpy as np
+import alphavantage
+import stockdata
+from ratelimit import Scheduler
+
+
+def test_load_series_downloads_once(server):
+    series, error = stockdata.load_series("AAPL", "daily")
+    assert error == ""
+    assert len(series) == 5200
+    assert server.requests[0]["outputsize"] == "full"
+    # Fresh in the cache -> no second call
+    again, error = stockdata.load_series("AAPL", "daily")
+    assert len(again) == len(series)
+    assert len(server.requests) == 1
+
+
+def test_load_series_from_start_date(server):
+    start = str(np.datetime64("today", "D") - 30)
+    series, error = stockdata.load_series("MSFT", "daily", start=start)
+    assert error == ""
+    assert str(series.dates[0]) >= start
+    assert stockdata.series_cache.first_date("MSFT", "daily") == start
+    # An earlier start date is not covered by the cache -> downloaded again
+    stockdata.load_series("MSFT", "daily", start=str(np.datetime64("today", "D") - 60))
+    assert len(server.requests) == 2
+
+
+def test_stale_series_only_downloads_the_tail(server):
+    stockdata.load_series("JNJ", "daily")
+    stockdata.series_cache.max_age = -1
+    series, error = stockdata.load_series("JNJ", "daily")
+    assert error == ""
+    assert len(series) == 5200
+    assert server.requests[1]["outputsize"] == "compact"
+
+
+def test_adjusted_history_is_downloaded_again(server, monkeypatch):
+    before, error = stockdata.load_series("PG", "daily")
+    stockdata.series_cache.max_age = -1
+    answer = server.answer
+
+    def after_dividend(params):
+        data = answer(params)
+        for bar in data["Time Series (Daily)"].values():
+            bar["5. adjusted close"] = f"{float(bar['5. adjusted close']) * 0.99:.4f}"
+        return data
+
+    monkeypatch.setattr(server, "answer", after_dividend)
+    series, error = stockdata.load_series("PG", "daily")
+    assert error == ""
+    assert [request["outputsize"] for request in server.requests] == ["full", "compact", "full"]
+    # No seam: the whole history has the new adjustment
+    assert len(series) == 5200
+    assert np.allclose(series["adjusted_close"], before["adjusted_close"] * 0.99, atol=1e-4)
+
+
+def test_errors(server, monkeypatch):
+    assert stockdata.load_series("NOPE", "daily") == (None, "Ticker Symbol not found!")
+    # Throttled by AlphaVantage (one attempt only, the blocked key belongs to this test's scheduler)
+    monkeypatch.setattr(alphavantage, "RETRIES", 0)
+    monkeypatch.setattr(alphavantage, "scheduler", Scheduler(per_minute=100, per_day=1000))
+    monkeypatch.setattr(server, "note_rate", 1.0)
+    assert stockdata.load_series("KO", "daily") == (None, "AlphaVantage API Call frequency exceeded!")
+
+
+def test_empty_time_frame(server):
+    # Start after the newest bar: nothing to show and nothing is cached
+    assert stockdata.load_series("AAPL", "daily", start="2999-01-01") == \
+        (None, "No trading days in the given time frame!")
+    assert not stockdata.series_cache.contains("AAPL", "daily")
+
+
+def test_infos_and_quote(server):
+    infos = stockdata.get_infos("AAPL")
+    assert infos["error message"] == ""
+    assert infos["price"] > 0
+    assert sorted(request["function"] for request in server.requests) == ["GLOBAL_QUOTE", "SYMBOL_SEARCH"]
+    quote = stockdata.get_quote("AAPL")
+    assert quote["price"] == infos["price"]
+    assert stockdata.get_infos("no symbol!")["error message"] == "Ticker Symbol not found!"
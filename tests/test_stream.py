@@ -0,0 +1,59 @@
+import json
+import numpy as np
+import pytest
+import alphavantage
+from series import PriceSeries
+from stream import SeriesParser
+from mock_server import make_time_series, NOTE
+
+KEY = "Time Series (Daily)"
+
+
+def parse(text, chunk_size, stop_before=None):
+    parser = SeriesParser(KEY, stop_before)
+    data = text.encode()
+    for i in range(0, len(data), chunk_size):
+        if parser.feed(data[i:i + chunk_size]):
+            break
+    return parser.finish(), parser.bytes
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, 64 * 1024])
+def test_parse_matches_json(chunk_size):
+    answer = {"Meta Data": {"2. Symbol": "AAPL"}, KEY: make_time_series(300)}
+    expected = PriceSeries.from_json(answer[KEY])
+    data, size = parse(json.dumps(answer, indent=4), chunk_size)
+    assert data["Meta Data"] == {"2. Symbol": "AAPL"}
+    series = data[KEY]
+    assert np.array_equal(series.dates, expected.dates)
+    assert sorted(series.columns) == sorted(expected.columns)
+    for name in expected.columns:
+        assert np.array_equal(series[name], expected[name])
+
+
+def test_parse_stops_before_date():
+    text = json.dumps({"Meta Data": {}, KEY: make_time_series(3000)})
+    data, size = parse(text, 1024, stop_before="2020-12-01")
+    series = data[KEY]
+    assert str(series.dates[0]) >= "2020-12-01"
+    assert str(series.dates[-1]) == "2020-12-31"
+    assert size < len(text) / 10    # The rest of the answer is never read
+
+
+def test_parse_empty_series_and_note():
+    assert len(parse(json.dumps({"Meta Data": {}, KEY: {}}), 5)[0][KEY]) == 0
+    assert parse(json.dumps(NOTE), 5)[0] == NOTE
+
+
+def test_incomplete_answer():
+    text = json.dumps({"Meta Data": {}, KEY: make_time_series(10)})
+    with pytest.raises(ValueError):
+        parse(text[:len(text) // 2], 64)
+
+
+def test_query_series_from_mock_server(server):
+    data = alphavantage.query_series("TIME_SERIES_DAILY_ADJUSTED", "demo", KEY, symbol="AAPL", outputsize="compact")
+    series = data[KEY]
+    assert len(series) == 100
+    assert np.all(np.diff(series.dates).astype(int) > 0)
+    assert data["Meta Data"]["2. Symbol"] == "AAPL"
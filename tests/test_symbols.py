@@ -0,0 +1,64 @@
+import stockdata
+from symbols import SymbolIndex
+
+
+def test_symbol_prefix(tmp_path):
+    index = SymbolIndex("symbols_2.txt", str(tmp_path / "symbols.pickle"))
+    assert "AAPL" in [row[4] for row in index.search("aap")]
+    assert "AAPL" in index
+    assert "NOPE" not in index
+    assert index.search("") == []
+
+
+def test_symbol_prefix_is_sure(tmp_path):
+    index = SymbolIndex("symbols_2.txt", str(tmp_path / "symbols.pickle"))
+    rows, sure = index.lookup("aap")
+    assert sure
+    assert index.search("aap") == rows
+
+
+def test_fuzzy_name_is_a_guess(tmp_path):
+    # The symbols file has no company names, a name only matches fuzzily on the symbols
+    index = SymbolIndex("symbols_2.txt", str(tmp_path / "symbols.pickle"))
+    assert not index.lookup("Allianz")[1]
+    assert index.lookup("") == ([], False)
+
+
+def test_merged_matches(tmp_path):
+    index = SymbolIndex("symbols_2.txt", str(tmp_path / "symbols.pickle"))
+    index.merge([{"1. symbol": "ALV.DE", "2. name": "Allianz SE", "3. type": "Equity", "4. region": "Germany",
+                  "8. currency": "EUR"}])
+    assert index.search("Allianz")[0][1:] == ["Allianz SE", "Germany", "Equity", "ALV.DE"]
+    # The merged entries are kept in the binary index
+    reloaded = SymbolIndex("symbols_2.txt", str(tmp_path / "symbols.pickle"))
+    assert "alv.de" in reloaded
+    assert reloaded.info("alv.de")["currency"] == "EUR"
+
+
+def test_merged_names_are_sure(tmp_path):
+    index = SymbolIndex("symbols_2.txt", str(tmp_path / "symbols.pickle"))
+    index.merge([{"1. symbol": "ALV.DE", "2. name": "Allianz SE", "3. type": "Equity", "4. region": "Germany",
+                  "8. currency": "EUR"}])
+    rows, sure = index.lookup("Allianz")
+    assert sure
+    assert rows[0][4] == "ALV.DE"
+
+
+def test_search_results_from_mock_server(server):
+    results = stockdata.get_search_results("MSFT")
+    assert "MSFT" in [row[4] for row in results]
+    assert server.requests[-1]["function"] == "SYMBOL_SEARCH"
+    # Second search comes from the search cache
+    assert stockdata.get_search_results("msft") == results
+    assert len(server.requests) == 1
+
+
+def test_answers_without_matches_are_not_cached(server, monkeypatch):
+    answer = server.answer
+    monkeypatch.setattr(server, "answer", lambda params: {"Information": "Please use a valid API key"})
+    assert stockdata.get_search_results("AAPL") == []
+    assert stockdata.get_infos("AAPL")["error message"] == "Ticker Symbol not found!"
+    assert stockdata.search_cache.get("AAPL") is None
+    # The next search asks AlphaVantage again
+    monkeypatch.setattr(server, "answer", answer)
+    assert "AAPL" in [row[4] for row in stockdata.get_search_results("AAPL")]
@@ -0,0 +1,90 @@
+import time
+import threading
+import pytest
+from PyQt5 import QtCore
+from workers import Dispatcher
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+@pytest.fixture
+def dispatcher(app):
+    pool = QtCore.QThreadPool()
+    pool.setMaxThreadCount(1)   # Later calls stay queued while the first one runs
+    yield Dispatcher(pool)
+    pool.waitForDone(5000)
+
+
+def wait_for(condition, app, timeout=5.0):
+    # The results are delivered by queued signals, which need the event loop
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        app.processEvents()
+        time.sleep(0.001)
+    app.processEvents()
+    return condition()
+
+
+def test_identical_calls_run_once(dispatcher, app):
+    release = threading.Event()
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    results = {}
+    dispatcher.submit("a", lambda result: results.update(a=result), slow, 21)
+    dispatcher.submit("b", lambda result: results.update(b=result), slow, 21)
+    release.set()
+    assert wait_for(lambda: len(results) == 2, app)
+    assert results == {"a": 42, "b": 42}
+    assert calls == [21]
+
+
+def test_newer_call_supersedes_older_one(dispatcher, app):
+    release = threading.Event()
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        release.wait(5)
+        return value
+
+    results = []
+    dispatcher.submit("blocker", lambda result: None, slow, 0)
+    dispatcher.submit("owner", results.append, slow, 1)
+    dispatcher.submit("owner", results.append, slow, 2)     # Takes the queued call out of the pool
+    release.set()
+    assert wait_for(lambda: results, app)
+    assert wait_for(lambda: not dispatcher.workers, app)
+    assert results == [2]
+    assert calls == [0, 2]
+    assert not dispatcher.pending("owner")
+
+
+def test_failed_call_reaches_owner(dispatcher, app):
+    failures = []
+    dispatcher.failed.connect(lambda owner, message: failures.append((owner, message)))
+
+    def broken():
+        raise ConnectionError("offline")
+
+    dispatcher.submit("owner", lambda result: None, broken)
+    assert wait_for(lambda: failures, app)
+    assert failures == [("owner", "ConnectionError: offline")]
+
+
+def test_resubmit_before_delivery(dispatcher, app):
+    results = []
+    dispatcher.submit("owner", results.append, abs, -1)
+    dispatcher.pool.waitForDone(5000)   # run() has returned, the finished signal is still queued
+    dispatcher.submit("owner", results.append, abs, -1)
+    dispatcher.cancel("other")
+    assert wait_for(lambda: results, app)
+    assert results == [1]
+    assert not dispatcher.workers
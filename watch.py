@@ -0,0 +1,80 @@
+import os
+import time
+import threading
+
+
+class WatchList(object):
+    """Class keeps the pinned symbols with their latest quote. The symbols are refreshed one at a time,
+    always the one whose quote is the oldest, so n pinned symbols at c calls per minute are all refreshed
+    every n / c minutes. The pinned symbols are kept in a file (comma separated like symbols_2.txt)."""
+
+    def __init__(self, path=os.path.join("cache", "watchlist.txt")):
+        self.path = path
+        self.lock = threading.Lock()
+        self.rows = {}      # symbol -> {"price", "change percent", "updated", "error message", "refreshed"}
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                for symbol in file.read().split(","):
+                    if symbol.strip():
+                        self.rows[symbol.strip().upper()] = self._empty_row()
+
+    @staticmethod
+    def _empty_row():
+        # refreshed = 0 -> never refreshed, so a new symbol is the next one due
+        return {"price": "", "change percent": "", "updated": "", "error message": "", "refreshed": 0.0}
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as file:
+                file.write(",".join(self.rows))
+        except OSError:     # The symbols are still watched, they are just not remembered for the next start
+            pass
+
+    def pin(self, symbol):
+        """Method adds a symbol, returns False if it was already pinned"""
+        symbol = symbol.strip().upper()
+        with self.lock:
+            if not symbol or symbol in self.rows:
+                return False
+            self.rows[symbol] = self._empty_row()
+            self._save()
+            return True
+
+    def unpin(self, symbol):
+        with self.lock:
+            if self.rows.pop(symbol.strip().upper(), None) is not None:
+                self._save()
+
+    def symbols(self):
+        with self.lock:
+            return list(self.rows)
+
+    def row(self, symbol):
+        with self.lock:
+            return dict(self.rows[symbol])
+
+    def next_due(self):
+        """Method returns the symbol whose quote is the oldest (None if nothing is pinned)"""
+        with self.lock:
+            if not self.rows:
+                return None
+            return min(self.rows, key=lambda symbol: self.rows[symbol]["refreshed"])
+
+    def update(self, symbol, quote):
+        """Method stores a quote (dictionary of get_quote) and returns True if the row has to be repainted,
+        i.e. if price, change, date or error message differ from the ones shown"""
+        with self.lock:
+            row = self.rows.get(symbol)
+            if row is None:     # Unpinned while the quote was loading
+                return False
+            row["refreshed"] = time.monotonic()
+            changed = False
+            # A failed refresh (e.g. exceeded limit) keeps the last known price and only shows the error
+            fields = ("error message",) if quote.get("error message") else \
+                ("price", "change percent", "updated", "error message")
+            for field in fields:
+                if quote.get(field, "") != row[field]:
+                    row[field] = quote.get(field, "")
+                    changed = True
+            return changed
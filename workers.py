@@ -0,0 +1,94 @@
+import itertools
+from PyQt5 import QtCore
+
+
+class WorkerSignals(QtCore.QObject):
+    """Signals of a Worker (a QRunnable is no QObject and cannot emit signals itself)"""
+    finished = QtCore.pyqtSignal(object, object)    # key, result
+    failed = QtCore.pyqtSignal(object, str)         # key, error message
+
+
+class Worker(QtCore.QRunnable):
+    """Runnable which calls function(*args) on a thread of the QThreadPool"""
+
+    def __init__(self, key, function, args):
+        super().__init__()
+        self.key = key
+        self.function = function
+        self.args = args
+        self.signals = WorkerSignals()
+        # The Dispatcher keeps the worker until its result is delivered, the pool must not delete it when run()
+        # returns (cancel would call tryTake on a deleted object while the finished signal is still queued)
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            result = self.function(*self.args)
+        except Exception as error:  # Network errors etc. must not get lost on the worker thread
+            self.signals.failed.emit(self.key, f"{type(error).__name__}: {error}")
+        else:
+            self.signals.finished.emit(self.key, result)
+
+
+class Dispatcher(QtCore.QObject):
+    """Class runs blocking calls (the AlphaVantage requests) in the background and hands the results
+    back to the GUI thread:
+        - identical calls which are already queued or running are only executed once (coalescing)
+        - a newer call for the same owner (e.g. the quote labels) supersedes the older one, the older one
+          is taken out of the queue if it has not started yet, otherwise its result is dropped"""
+    failed = QtCore.pyqtSignal(object, str)     # owner, error message
+
+    def __init__(self, pool=None, parent=None):
+        super().__init__(parent)
+        self.pool = pool or QtCore.QThreadPool.globalInstance()
+        self.workers = {}   # key -> Worker which is queued or running
+        self.waiting = {}   # key -> list of (owner, ticket, callback) waiting for that worker
+        self.latest = {}    # owner -> ticket of the newest call of that owner
+        self.tickets = itertools.count()
+
+    def submit(self, owner, callback, function, *args):
+        """Method calls function(*args) in the background and callback(result) on the GUI thread"""
+        ticket = next(self.tickets)
+        self.cancel(owner)
+        self.latest[owner] = ticket
+        key = (function, args)
+        self.waiting.setdefault(key, []).append((owner, ticket, callback))
+        if key not in self.workers:
+            worker = Worker(key, function, args)
+            worker.signals.finished.connect(self._finished)
+            worker.signals.failed.connect(self._failed)
+            self.workers[key] = worker
+            self.pool.start(worker)
+        return ticket
+
+    def cancel(self, owner):
+        """Method drops the pending call of an owner (and stops its worker if nobody else waits for it)"""
+        self.latest.pop(owner, None)
+        for key in list(self.waiting):
+            self.waiting[key] = [waiter for waiter in self.waiting[key] if waiter[0] != owner]
+            if not self.waiting[key]:
+                del self.waiting[key]
+                # tryTake only succeeds if the worker has not started yet, a running request is left to finish
+                # (its result still ends up in the cache)
+                if self.pool.tryTake(self.workers[key]):
+                    del self.workers[key]
+
+    def pending(self, owner):
+        return owner in self.latest
+
+    def _deliver(self, key):
+        self.workers.pop(key, None)
+        receivers = []
+        for owner, ticket, callback in self.waiting.pop(key, []):
+            if self.latest.get(owner) == ticket:    # Only the newest call of an owner is delivered
+                del self.latest[owner]
+                receivers.append((owner, callback))
+        return receivers
+
+    def _finished(self, key, result):
+        for owner, callback in self._deliver(key):
+            callback(result)
+
+    def _failed(self, key, message):
+        for owner, callback in self._deliver(key):
+            self.failed.emit(owner, message)